@@ -0,0 +1,129 @@
+"""
+Seeded procedural upcoming asteroids, instead of listing each one in the
+state file.
+
+In place of upcoming_asteroid_* lines, the upcoming_asteroids_count line of a
+text state file is followed by a single spawner line:
+
+    upcoming_asteroids_count 1000000
+    upcoming_spawner seed=7,next_id=10,small=0.5,angle_min=0,angle_max=359,angle_step=1,avoid=100
+
+upcoming_asteroids_count asteroids are generated as they are needed, with
+ids counting up from next_id (by default one more than the largest id of
+the current asteroids). Each asteroid is generated from its own
+random.Random seeded by seed and its id, so the spawner's whole state is
+next_id and a saved game resumes exactly. Parameters:
+
+    seed        required
+    small       fraction of asteroids that are small (default 0.5)
+    angle_min   headings are angle_min to angle_max degrees inclusive, in
+    angle_max   steps of angle_step, taken mod 360 (default 0, 359, 1)
+    angle_step
+    avoid       asteroids are not placed within avoid of the spaceship
+                (default 0), which must be less than half the smaller of
+                width and height
+
+Asteroid speed is config.speed of its size, as for listed asteroids.
+"""
+
+import math
+import random
+from space_object import SpaceObject
+
+spawner_key = 'upcoming_spawner'
+#parameter defaults, None if required, in the order they are written
+defaults = {'seed': None,
+            'next_id': None,
+            'small': 0.5,
+            'angle_min': 0,
+            'angle_max': 359,
+            'angle_step': 1,
+            'avoid': 0.0}
+int_params = ('seed', 'next_id', 'angle_min', 'angle_max', 'angle_step')
+
+
+def parse_params(value, line_num):
+    '''returns dict of spawner parameters from "key=value,..."'''
+    params = {}
+    for item in value.split(','):
+        key, sep, text = item.partition('=')
+        if not sep or key not in defaults or key in params:
+            raise ValueError(f'Error: unexpected spawner parameter {key} in line {line_num}')
+        try:
+            params[key] = int(text) if key in int_params else float(text)
+        except ValueError:
+            raise ValueError(f'Error: invalid data type in line {line_num}')
+    return params
+
+
+class AsteroidSpawner:
+    '''Upcoming asteroids generated on demand. Supports the list operations
+    Engine uses to replenish asteroids: len and pop(0)'''
+
+    def __init__(self, params, count, spaceship, line_num=None):
+        for key, default in defaults.items():
+            params.setdefault(key, default)
+        if params['seed'] is None:
+            raise ValueError(f'Error: spawner needs a seed in line {line_num}')
+        width = spaceship.width
+        height = spaceship.height
+        if (not 0 <= params['small'] <= 1 or params['angle_step'] < 1 or
+                params['angle_min'] > params['angle_max'] or
+                not 0 <= params['avoid'] < min(width, height) / 2):
+            raise ValueError(f'Error: invalid spawner parameters in line {line_num}')
+        self.params = params
+        self.count = max(0, count)
+        self.spaceship = spaceship #asteroids are placed away from it
+        self.width = width
+        self.height = height
+
+    @classmethod
+    def from_line(cls, line, count, spaceship, asteroid_ls, line_num=None):
+        '''returns spawner from a state file line, asteroid_ls giving the
+        default next_id'''
+        key_value = line.strip().split(' ')
+        if len(key_value) != 2 or key_value[0] != spawner_key:
+            raise ValueError(f'Error: invalid data type in line {line_num}')
+        params = parse_params(key_value[1], line_num)
+        if 'next_id' not in params:
+            params['next_id'] = max([asteroid.id for asteroid in asteroid_ls],
+                                    default=-1) + 1
+        return cls(params, count, spaceship, line_num)
+
+    def line(self):
+        '''returns the state file line that resumes this spawner'''
+        return spawner_key + ' ' + ','.join(f'{key}={self.params[key]}'
+                                            for key in defaults)
+
+    def __len__(self):
+        return self.count
+
+    def spawn(self, id):
+        '''returns (x, y, angle, obj_type) of the asteroid with id'''
+        params = self.params
+        rng = random.Random(f'{params["seed"]}:{id}')
+        obj_type = 'asteroid_small' if rng.random() < params['small'] else 'asteroid_large'
+        angle = rng.randrange(params['angle_min'], params['angle_max'] + 1,
+                            params['angle_step']) % 360
+        #positions have the precision of a text state file, as listed
+        #upcoming asteroids do
+        while True:
+            x = round(rng.uniform(0, self.width), 1) % self.width
+            y = round(rng.uniform(0, self.height), 1) % self.height
+            x_diff = abs(x - self.spaceship.x)
+            y_diff = abs(y - self.spaceship.y)
+            x_diff = min(x_diff, self.width - x_diff)
+            y_diff = min(y_diff, self.height - y_diff)
+            if math.sqrt(x_diff * x_diff + y_diff * y_diff) >= params['avoid']:
+                return x, y, angle, obj_type
+
+    def pop(self, index=0):
+        if index != 0:
+            raise IndexError('AsteroidSpawner only supports pop(0)')
+        if self.count == 0:
+            raise IndexError('pop from empty AsteroidSpawner')
+        id = self.params['next_id']
+        x, y, angle, obj_type = self.spawn(id)
+        self.params['next_id'] += 1
+        self.count -= 1
+        return SpaceObject(x, y, self.width, self.height, angle, obj_type, id)
@@ -0,0 +1,318 @@
+"""
+Batched engine advancing many independent games at once.
+
+    batch = BatchEngine(['examples/game_state_good.txt'] * 256)
+    while not batch.done.all():
+        done, score = batch.step(actions)  # actions: (worlds, 4) bools,
+                                           # thrust, left, right, bullet
+
+Every world's spaceship, asteroids and bullets are held in NumPy arrays with
+a row per world; worlds with fewer objects leave slots unused, marked by the
+alive masks. step applies the rules of Engine.update to every world which
+is not done: movement, bullet ageing, fuel use and warnings, scoring,
+collisions (lowest asteroid id first, each taking the lowest id bullet
+hitting it) and replenishment from the world's upcoming asteroids. Positions
+match Engine bit for bit. Events are counted rather than printed.
+"""
+
+import sys
+import config
+from game_engine import Engine
+from space_object import SpaceObject
+from asteroid_spawner import AsteroidSpawner
+from trig_table import velocity
+
+try:
+    import numpy as np
+except ImportError:
+    print("Error: 'numpy' module is not installed.")
+    sys.exit(1)
+
+from world_arrays import obj_types, type_codes, velocity_x, velocity_y
+
+spaceship_code = type_codes['spaceship']
+bullet_code = type_codes['bullet']
+small_code = type_codes['asteroid_small']
+radius = np.array([config.radius[obj_type] for obj_type in obj_types])
+fuel_warning_threshold = np.array(config.fuel_warning_threshold)
+
+
+def velocities(type_code, angle):
+    '''returns (dx, dy) arrays moved per frame by objects of type_code at
+    angle, from the same table as SpaceObject.move_forward'''
+    normal = (angle >= 0) & (angle < 360)
+    dx = velocity_x[type_code, angle % 360]
+    dy = velocity_y[type_code, angle % 360]
+    for i in np.nonzero(~normal)[0]: #headings from a state file are not
+        #always normalised
+        dx[i], dy[i] = velocity(obj_types[type_code[i]], int(angle[i]))
+    return dx, dy
+
+
+class BatchEngine:
+    def __init__(self, game_state_filenames):
+        #load each world with Engine's importers, only game state is needed
+        states = []
+        for filename in game_state_filenames:
+            state = Engine.__new__(Engine)
+            state.import_state(filename)
+            states.append(state)
+        self.worlds = len(states)
+        self.upcoming = [state.upcoming_asteroid_ls for state in states]
+
+        def per_world(values, dtype=np.int64):
+            return np.array(values, dtype=dtype)
+
+        game_states = [state.game_state for state in states]
+        self.width = per_world([s['width'] for s in game_states])
+        self.height = per_world([s['height'] for s in game_states])
+        self.score = per_world([s['score'] for s in game_states])
+        self.fuel = per_world([s['fuel'] for s in game_states])
+        self.asteroids_count = per_world([s['asteroids_count'] for s in game_states])
+        self.upcoming_count = per_world([s['upcoming_asteroids_count']
+                                        for s in game_states])
+        self.max_fuel = per_world([state.max_fuel for state in states])
+        self.bullet_id_counter = per_world([state.bullet_id_counter
+                                            for state in states])
+        self.fuel_warning_count = np.zeros(self.worlds, dtype=np.int64)
+        self.frame_count = np.zeros(self.worlds, dtype=np.int64)
+        self.hit_count = np.zeros(self.worlds, dtype=np.int64)
+        self.collision_count = np.zeros(self.worlds, dtype=np.int64)
+        self.done = np.zeros(self.worlds, dtype=bool)
+
+        spaceships = [s['spaceship'] for s in game_states]
+        self.ship_x = per_world([ship.x for ship in spaceships], float)
+        self.ship_y = per_world([ship.y for ship in spaceships], float)
+        self.ship_angle = per_world([ship.angle for ship in spaceships])
+        self.ship_id = per_world([ship.id for ship in spaceships])
+
+        #asteroid slots are never more than the largest asteroids_count, as
+        #replenishing only tops asteroids back up to it
+        self.asteroids = self.object_arrays(
+            max([1] + [len(state.asteroids) for state in states] +
+                list(self.asteroids_count)))
+        #bullets live bullet_move_count frames, one can be shot per frame
+        self.bullets = self.object_arrays(
+            max(len(state.bullets) for state in states) + config.bullet_move_count + 1)
+        for world, state in enumerate(states):
+            for asteroid in state.asteroids:
+                self.add(self.asteroids, world, asteroid)
+            for bullet in state.bullets:
+                self.add(self.bullets, world, bullet)
+
+    def object_arrays(self, slots):
+        '''returns dict of (worlds, slots) arrays for a group of objects'''
+        shape = (self.worlds, slots)
+        return {'x': np.zeros(shape),
+                'y': np.zeros(shape),
+                'angle': np.zeros(shape, dtype=np.int64),
+                'type_code': np.zeros(shape, dtype=np.int8),
+                'id': np.zeros(shape, dtype=np.int64),
+                'move_count': np.zeros(shape, dtype=np.int64),
+                'alive': np.zeros(shape, dtype=bool)}
+
+    def grow(self, group):
+        '''doubles the number of slots in group'''
+        for name, array in group.items():
+            wider = np.zeros((self.worlds, 2 * array.shape[1]), dtype=array.dtype)
+            wider[:, :array.shape[1]] = array
+            group[name] = wider
+
+    def add(self, group, world, space_obj):
+        '''copies space_obj into a free slot of world's row in group'''
+        if group['alive'][world].all():
+            self.grow(group)
+        slot = np.argmin(group['alive'][world]) #first free slot
+        group['x'][world, slot] = space_obj.x
+        group['y'][world, slot] = space_obj.y
+        group['angle'][world, slot] = space_obj.angle
+        group['type_code'][world, slot] = type_codes[space_obj.obj_type]
+        group['id'][world, slot] = space_obj.id
+        group['move_count'][world, slot] = getattr(space_obj, 'move_count', 0)
+        group['alive'][world, slot] = True
+
+    def move(self, group, mask):
+        '''moves objects in group where mask is set forward one frame'''
+        worlds, slots = np.nonzero(mask)
+        dx, dy = velocities(group['type_code'][worlds, slots],
+                            group['angle'][worlds, slots])
+        # % operator enables wraparound, same as SpaceObject.move_forward
+        group['x'][worlds, slots] = (group['x'][worlds, slots] + dx) % self.width[worlds]
+        group['y'][worlds, slots] = (group['y'][worlds, slots] - dy) % self.height[worlds]
+
+    def distance(self, x1, y1, x2, y2):
+        '''wraparound distance with the same arithmetic as collide_with;
+        x1, y1 have a first axis of worlds and x2, y2 broadcast against them'''
+        shape = (self.worlds,) + (1,) * (x1.ndim - 1)
+        width = self.width.reshape(shape)
+        height = self.height.reshape(shape)
+        x_diff = np.abs(x1 - x2)
+        x_diff = np.minimum(x_diff, width - x_diff)
+        y_diff = np.abs(y1 - y2)
+        y_diff = np.minimum(y_diff, height - y_diff)
+        return np.sqrt(x_diff * x_diff + y_diff * y_diff)
+
+    def step(self, actions):
+        '''advances every world which is not done by one frame given a
+        (worlds, 4) array of player inputs; returns (done, score) arrays'''
+        actions = np.asarray(actions, dtype=bool).reshape(self.worlds, 4)
+        active = ~self.done
+        thrust, left, right, shoot = (actions[:, i] & active for i in range(4))
+        self.frame_count += active
+
+        #spaceship movement
+        self.ship_angle[left] = (self.ship_angle[left] + config.angle_increment) % 360
+        self.ship_angle[right] = (self.ship_angle[right] - config.angle_increment) % 360
+        dx, dy = velocities(np.full(thrust.sum(), spaceship_code),
+                            self.ship_angle[thrust])
+        self.ship_x[thrust] = (self.ship_x[thrust] + dx) % self.width[thrust]
+        self.ship_y[thrust] = (self.ship_y[thrust] - dy) % self.height[thrust]
+
+        #shoot bullets
+        shot = shoot & (self.fuel >= config.shoot_fuel_threshold)
+        self.bullet_id_counter += shot
+        self.shoot_bullets(np.nonzero(shot)[0])
+
+        #move asteroids and bullets, removing expired bullets
+        asteroids = self.asteroids
+        bullets = self.bullets
+        self.move(asteroids, asteroids['alive'] & active[:, None])
+        bullets['alive'] &= ~(active[:, None] &
+                            (bullets['move_count'] >= config.bullet_move_count))
+        moving = bullets['alive'] & active[:, None]
+        bullets['move_count'] += moving
+        self.move(bullets, moving)
+
+        #fuel
+        self.fuel -= active * config.spaceship_fuel_consumption
+        self.fuel -= shot * config.bullet_fuel_consumption
+        percent_fuel = self.fuel / self.max_fuel * 100
+        warnings_left = self.fuel_warning_count < len(fuel_warning_threshold)
+        threshold = fuel_warning_threshold[np.minimum(self.fuel_warning_count,
+                                                    len(fuel_warning_threshold) - 1)]
+        out_of_fuel = active & ~warnings_left & (self.fuel <= 0)
+        self.fuel_warning_count += active & warnings_left & (percent_fuel <= threshold)
+
+        self.detect_collisions(active)
+        out_of_asteroids = self.replenish_asteroids(active)
+
+        self.done |= out_of_fuel | out_of_asteroids
+        return self.done.copy(), self.score.copy()
+
+    def shoot_bullets(self, worlds):
+        '''adds a bullet at the spaceship of each of worlds'''
+        bullets = self.bullets
+        if bullets['alive'][worlds].all(axis=1).any():
+            self.grow(bullets)
+        slots = np.argmin(bullets['alive'][worlds], axis=1) #first free slots
+        bullets['x'][worlds, slots] = self.ship_x[worlds]
+        bullets['y'][worlds, slots] = self.ship_y[worlds]
+        bullets['angle'][worlds, slots] = self.ship_angle[worlds]
+        bullets['type_code'][worlds, slots] = bullet_code
+        bullets['id'][worlds, slots] = self.bullet_id_counter[worlds]
+        bullets['move_count'][worlds, slots] = 0
+        bullets['alive'][worlds, slots] = True
+
+    def detect_collisions(self, active):
+        asteroids = self.asteroids
+        bullets = self.bullets
+        asteroid_alive = asteroids['alive'] & active[:, None]
+        bullet_alive = bullets['alive'] & active[:, None]
+
+        #bullet v asteroid, shape (worlds, asteroid slots, bullet slots)
+        dst = self.distance(asteroids['x'][:, :, None], asteroids['y'][:, :, None],
+                            bullets['x'][:, None, :], bullets['y'][:, None, :])
+        hits = ((dst <= (radius[bullet_code] + radius[asteroids['type_code']])[:, :, None]) &
+                asteroid_alive[:, :, None] & bullet_alive[:, None, :])
+
+        #low asteroid id takes priority, each asteroid is shot by the lowest
+        #id unused bullet that hits it
+        shot = np.zeros_like(asteroid_alive)
+        for world in np.nonzero(hits.any(axis=(1, 2)))[0]:
+            used = set()
+            asteroid_slots = np.nonzero(hits[world].any(axis=1))[0]
+            for a in sorted(asteroid_slots, key=lambda a: asteroids['id'][world, a]):
+                bullet_slots = np.nonzero(hits[world, a])[0]
+                for b in sorted(bullet_slots, key=lambda b: bullets['id'][world, b]):
+                    if b in used:
+                        continue
+                    used.add(b)
+                    shot[world, a] = True
+                    bullets['alive'][world, b] = False
+                    if asteroids['type_code'][world, a] == small_code:
+                        self.score[world] += config.shoot_small_ast_score
+                    else:
+                        self.score[world] += config.shoot_large_ast_score
+                    self.hit_count[world] += 1
+                    break
+
+        #asteroid v spaceship
+        dst = self.distance(asteroids['x'], asteroids['y'],
+                            self.ship_x[:, None], self.ship_y[:, None])
+        collided = ((dst <= radius[asteroids['type_code']] + radius[spaceship_code]) &
+                    asteroid_alive & ~shot)
+        collisions = collided.sum(axis=1)
+        self.score += collisions * config.collide_score
+        self.collision_count += collisions
+
+        asteroids['alive'] &= ~(shot | collided)
+
+    def replenish_asteroids(self, active):
+        '''tops asteroids back up to asteroids_count from each world's upcoming
+        asteroids; returns mask of worlds which ran out'''
+        out_of_asteroids = np.zeros(self.worlds, dtype=bool)
+        alive = self.asteroids['alive'].sum(axis=1)
+        for world in np.nonzero(active & (alive < self.asteroids_count))[0]:
+            for _ in range(self.asteroids_count[world] - alive[world]):
+                if len(self.upcoming[world]) == 0:
+                    self.asteroids_count[world] = self.asteroids['alive'][world].sum()
+                    out_of_asteroids[world] = True
+                    break
+                if isinstance(self.upcoming[world], AsteroidSpawner):
+                    #spawns away from the spaceship, which lives in arrays here
+                    self.upcoming[world].spaceship = self.spaceship(world)
+                self.add(self.asteroids, world, self.upcoming[world].pop(0))
+                self.upcoming_count[world] -= 1
+        return out_of_asteroids
+
+    def spaceship(self, world):
+        '''returns world's spaceship as a SpaceObject'''
+        return SpaceObject(float(self.ship_x[world]), float(self.ship_y[world]),
+                        int(self.width[world]), int(self.height[world]),
+                        int(self.ship_angle[world]), 'spaceship',
+                        int(self.ship_id[world]))
+
+    def world_state(self, world):
+        '''returns Engine (without player or GUI) holding the current state of
+        world, e.g. to export it. It shares the world's upcoming asteroids'''
+        def space_objs(group, obj_type=None):
+            alive = np.nonzero(group['alive'][world])[0]
+            space_objs = []
+            for slot in sorted(alive, key=lambda slot: group['id'][world, slot]):
+                space_obj = SpaceObject(
+                    float(group['x'][world, slot]), float(group['y'][world, slot]),
+                    int(self.width[world]), int(self.height[world]),
+                    int(group['angle'][world, slot]),
+                    obj_types[group['type_code'][world, slot]],
+                    int(group['id'][world, slot]))
+                if space_obj.obj_type == 'bullet':
+                    space_obj.move_count = int(group['move_count'][world, slot])
+                space_objs.append(space_obj)
+            return space_objs
+
+        state = Engine.__new__(Engine)
+        state.game_state = {
+            'width': int(self.width[world]),
+            'height': int(self.height[world]),
+            'score': int(self.score[world]),
+            'spaceship': self.spaceship(world),
+            'fuel': int(self.fuel[world]),
+            'asteroids_count': int(self.asteroids_count[world]),
+            'bullets_count': None,
+            'upcoming_asteroids_count': int(self.upcoming_count[world])}
+        state.asteroid_ls = space_objs(self.asteroids)
+        state.bullet_ls = space_objs(self.bullets)
+        state.upcoming_asteroid_ls = self.upcoming[world]
+        if isinstance(state.upcoming_asteroid_ls, AsteroidSpawner):
+            state.upcoming_asteroid_ls.spaceship = state.game_state['spaceship']
+        return state
@@ -0,0 +1,184 @@
+"""
+Runs many game state files headless across a process pool and writes an
+aggregated report.
+
+    python3 batch_runner.py examples/*.txt --player player:Player --report report.csv
+"""
+
+import os
+import io
+import sys
+import csv
+import json
+import time
+import signal
+import argparse
+import importlib
+import contextlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from game_engine import Engine
+from events import EventBus
+
+report_fields = ('state_file', 'status', 'score', 'frames', 'fuel', 'hits',
+                'collisions', 'seconds', 'error')
+
+
+class RunTimeout(Exception):
+    pass
+
+
+def load_class(spec):
+    '''returns class from a "module:Class" string'''
+    module_name, _, class_name = spec.partition(':')
+    return getattr(importlib.import_module(module_name), class_name)
+
+
+def raise_timeout(signum, frame):
+    raise RunTimeout()
+
+
+def check_timeout(timeout):
+    '''raises ValueError if timeout is set but cannot be enforced'''
+    if timeout and not hasattr(signal, 'setitimer'):
+        raise ValueError('Error: timeout needs signal.setitimer, which is not '
+                        'available on this platform')
+
+
+def run_one(state_file, player_spec='player:Player', timeout=None):
+    '''runs one headless game with player_spec, a "module:Class" string or
+    a player class; returns dict with a value for each of report_fields'''
+    check_timeout(timeout)
+    result = dict.fromkeys(report_fields)
+    result['state_file'] = state_file
+    start = time.perf_counter()
+
+    #timeout via SIGALRM so a stuck game is interrupted inside the worker
+    use_alarm = bool(timeout)
+    if use_alarm:
+        signal.signal(signal.SIGALRM, raise_timeout)
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+    game = None
+    try:
+        #game events are discarded, and anything the player prints, rather
+        #than flood the terminal
+        with contextlib.redirect_stdout(io.StringIO()):
+            player_class = (load_class(player_spec) if isinstance(player_spec, str)
+                            else player_spec)
+            game = Engine(state_file, player_class, headless=True,
+                        events=EventBus())
+            game.run_game()
+        result['status'] = 'ok'
+    except RunTimeout:
+        result['status'] = 'timeout'
+        result['error'] = f'Error: exceeded timeout of {timeout} seconds'
+    except (FileNotFoundError, ValueError) as e: #import_state errors
+        result['status'] = 'error'
+        result['error'] = str(e)
+    except (Exception, SystemExit) as e:
+        result['status'] = 'error'
+        result['error'] = f'{type(e).__name__}: {e}'
+    finally:
+        if use_alarm:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+
+    if game is not None:
+        result['score'] = game.game_state['score']
+        result['frames'] = game.frame_count
+        result['fuel'] = game.game_state['fuel']
+        result['hits'] = game.hit_count
+        result['collisions'] = game.collision_count
+    result['seconds'] = round(time.perf_counter() - start, 4)
+    return result
+
+
+def run_batch(state_files, player_spec='player:Player', workers=None,
+            timeout=None, progress=True):
+    '''runs each state file in a process pool; returns results in the order
+    of state_files'''
+    check_timeout(timeout)
+    results = [None] * len(state_files)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(run_one, state_file, player_spec, timeout): i
+                for i, state_file in enumerate(state_files)}
+        for done, future in enumerate(as_completed(futures), 1):
+            i = futures[future]
+            try:
+                results[i] = future.result()
+            except BrokenProcessPool as e: #a worker died, killed or crashed
+                results[i] = dict.fromkeys(report_fields)
+                results[i].update(state_file=state_files[i], status='error',
+                                error=f'{type(e).__name__}: {e}')
+            if progress:
+                print(f'[{done}/{len(state_files)}] {results[i]["status"]:7} '
+                    f'{state_files[i]}', file=sys.stderr)
+    return results
+
+
+def summarize(results):
+    '''returns dict of aggregate statistics and failed runs'''
+    ok = [result for result in results if result['status'] == 'ok']
+    scores = [result['score'] for result in ok]
+    return {'runs': len(results),
+            'ok': len(ok),
+            'errors': sum(result['status'] == 'error' for result in results),
+            'timeouts': sum(result['status'] == 'timeout' for result in results),
+            'mean_score': sum(scores) / len(scores) if scores else None,
+            'min_score': min(scores, default=None),
+            'max_score': max(scores, default=None),
+            'failures': [{'state_file': result['state_file'],
+                        'error': result['error']}
+                        for result in results if result['status'] != 'ok']}
+
+
+def write_report(results, report_filename):
+    '''writes results as JSON (with summary) if filename ends in .json,
+    otherwise as CSV'''
+    if os.path.splitext(report_filename)[1] == '.json':
+        with open(report_filename, 'w') as f:
+            json.dump({'summary': summarize(results), 'runs': results}, f,
+                    indent=2)
+    else:
+        with open(report_filename, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=report_fields)
+            writer.writeheader()
+            writer.writerows(results)
+
+
+def print_summary(summary):
+    print(f'{summary["ok"]}/{summary["runs"]} runs ok, '
+        f'{summary["errors"]} errors, {summary["timeouts"]} timeouts')
+    if summary['mean_score'] is not None:
+        print(f'Score mean {summary["mean_score"]:.1f} '
+            f'min {summary["min_score"]} max {summary["max_score"]}')
+    for failure in summary['failures']:
+        print(f'{failure["state_file"]}: {failure["error"]}')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Run game state files headless '
+                                                'in parallel')
+    parser.add_argument('state_files', nargs='+')
+    parser.add_argument('--player', default='player:Player',
+                        help='player class as module:Class')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--timeout', type=float, default=None,
+                        help='seconds allowed per run')
+    parser.add_argument('--report', default='batch_report.csv',
+                        help='.csv or .json report file')
+    parser.add_argument('--quiet', action='store_true',
+                        help='no per-run progress')
+    args = parser.parse_args(argv)
+    try:
+        check_timeout(args.timeout)
+    except ValueError as e:
+        parser.error(str(e))
+
+    results = run_batch(args.state_files, args.player, args.workers,
+                        args.timeout, not args.quiet)
+    write_report(results, args.report)
+    print_summary(summarize(results))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,167 @@
+"""
+Benchmarks engine and player hot paths on generated scenarios.
+
+    python3 benchmark.py --save baseline.json         # record a baseline
+    python3 benchmark.py --baseline baseline.json     # compare against it
+
+Results are seconds per operation, keyed "<benchmark>[<asteroids>]".
+"""
+
+import os
+import io
+import sys
+import json
+import time
+import argparse
+import platform
+import tempfile
+import contextlib
+from game_engine import Engine
+from player import Player
+from scenario_generator import generate_state
+
+
+class IdlePlayer:
+    def action(self, spaceship, asteroid_ls, bullet_ls, fuel, score):
+        return (False, False, False, False)
+
+
+def best_time(function, repeat=5, number=1, setup=None):
+    '''returns best seconds per call of function over repeat runs, calling
+    setup untimed before each run'''
+    best = None
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        for _ in range(number):
+            function()
+        elapsed = (time.perf_counter() - start) / number
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+
+def bench_size(state_file, size, player_sizes, repeat):
+    '''returns dict of benchmark name -> seconds per operation'''
+    results = {}
+    export_file = state_file + '.export'
+
+    results['import_state'] = best_time(lambda: Engine(state_file, IdlePlayer),
+                                        repeat)
+    game = Engine(state_file, IdlePlayer)
+    results['export_state'] = best_time(lambda: game.export_state(export_file),
+                                        repeat)
+    os.remove(export_file)
+
+    #per object operations, reported per object/pair
+    asteroid_ls = game.asteroid_ls
+    spaceship = game.game_state['spaceship']
+    def move_all():
+        for asteroid in asteroid_ls:
+            asteroid.move_forward()
+    results['move_forward'] = best_time(move_all, repeat) / len(asteroid_ls)
+    def collide_all():
+        for asteroid in asteroid_ls:
+            spaceship.collide_with(asteroid)
+    results['collide_with'] = best_time(collide_all, repeat) / len(asteroid_ls)
+
+    #one headless frame of run_game, with events printed to nowhere
+    game = Engine(state_file, IdlePlayer)
+    def frame():
+        game.update(game.player.action(game.game_state['spaceship'],
+                                    game.asteroid_ls,
+                                    game.bullet_ls, game.game_state['fuel'],
+                                    game.game_state['score']))
+        game.GUI.update_frame(game.game_state['spaceship'], game.asteroid_ls,
+                            game.bullet_ls, game.game_state['score'],
+                            game.game_state['fuel'])
+    with contextlib.redirect_stdout(io.StringIO()):
+        results['frame'] = best_time(frame, repeat, number=5)
+
+    if size in player_sizes:
+        game = Engine(state_file, IdlePlayer)
+        #a new player each run, as Player keeps its plan between calls and
+        #a repeated call would only time the cached path
+        players = []
+        results['player_action'] = best_time(
+            lambda: players[-1].action(game.game_state['spaceship'],
+                                    game.asteroid_ls.copy(), game.bullet_ls,
+                                    game.game_state['fuel'],
+                                    game.game_state['score']),
+            repeat, setup=lambda: players.append(Player()))
+    return results
+
+
+def run_benchmarks(sizes=(10, 100, 1000, 10000, 100000),
+                player_sizes=(10, 100, 1000), upcoming=100000, bullets=20,
+                seed=0, repeat=5):
+    '''returns benchmark results for generated scenarios of each size'''
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for size in sizes:
+            state_file = os.path.join(directory, f'state_{size}.txt')
+            generate_state(state_file, seed, asteroids=size, upcoming=upcoming,
+                        bullets=bullets, fuel=10**6)
+            for name, seconds in bench_size(state_file, size, player_sizes,
+                                            repeat).items():
+                results[f'{name}[{size}]'] = seconds
+            print(f'{size} asteroids done', file=sys.stderr)
+    return {'meta': {'python': platform.python_version(),
+                    'platform': platform.platform(),
+                    'time': time.strftime('%Y-%m-%d %H:%M:%S'),
+                    'seed': seed,
+                    'upcoming': upcoming,
+                    'bullets': bullets},
+            'results': results}
+
+
+def compare(results, baseline, tolerance=0.2):
+    '''returns list of (name, baseline, new) for results slower than baseline
+    by more than tolerance'''
+    regressions = []
+    for name, seconds in results['results'].items():
+        old = baseline['results'].get(name)
+        if old is not None and seconds > old * (1 + tolerance):
+            regressions.append((name, old, seconds))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark engine and player')
+    parser.add_argument('--sizes', type=int, nargs='+',
+                        default=[10, 100, 1000, 10000, 100000])
+    parser.add_argument('--player-sizes', type=int, nargs='+',
+                        default=[10, 100, 1000],
+                        help='sizes to also benchmark Player.action on')
+    parser.add_argument('--upcoming', type=int, default=100000)
+    parser.add_argument('--bullets', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--save', help='write results as JSON baseline')
+    parser.add_argument('--baseline', help='JSON baseline to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='allowed slowdown before reporting a regression')
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.sizes, args.player_sizes, args.upcoming,
+                            args.bullets, args.seed, args.repeat)
+    for name, seconds in results['results'].items():
+        print(f'{name:28} {seconds * 1e6:12.2f} us')
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        for name, old, new in regressions:
+            print(f'Regression: {name} {old * 1e6:.2f} us -> {new * 1e6:.2f} us')
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,236 @@
+"""
+Compact binary game state format.
+
+Layout (little endian, no padding):
+    header   magic b'CWST', version, width, height, score, fuel,
+             asteroids_count, bullets_count, upcoming_asteroids_count
+    records  spaceship, asteroids, bullets, upcoming asteroids
+
+Each record is x, y (float64), angle (int32), id (int64), obj_type code (uint8).
+Files are memory-mapped when loaded and upcoming asteroids are only decoded
+as they are added to the game; the mapping is closed once they have all been
+added, or by RecordQueue.close. Files are written to a temporary file which
+then replaces the output, so a game can be saved over the file it is still
+reading upcoming asteroids from. Games whose upcoming asteroids come from a
+spawner (see asteroid_spawner.py) are saved as spawner_version, which has no
+upcoming asteroid records and ends with the spawner's text state file line.
+
+Convert between formats with `python3 binary_state.py <input> <output>`;
+the direction is picked from the input file.
+"""
+
+import os
+import contextlib
+import sys
+import mmap
+import struct
+from space_object import SpaceObject
+from asteroid_spawner import AsteroidSpawner
+
+magic = b'CWST'
+version = 1
+spawner_version = 2
+header_struct = struct.Struct('<4sHiiqqqqq')
+record_struct = struct.Struct('<ddiqB')
+
+#obj_type stored in records as index into this tuple
+obj_types = ('spaceship', 'bullet', 'asteroid_small', 'asteroid_large')
+type_codes = {obj_type: code for code, obj_type in enumerate(obj_types)}
+
+
+def is_binary_state(game_state_filename):
+    '''returns True if file starts with the binary state magic bytes'''
+    try:
+        with open(game_state_filename, 'rb') as f:
+            return f.read(len(magic)) == magic
+    except (FileNotFoundError, IsADirectoryError):
+        return False
+
+
+class RecordQueue:
+    '''Upcoming asteroids read lazily from memory-mapped records. Supports the
+    list operations Engine uses: len, iteration and pop(0)'''
+
+    def __init__(self, buffer, offset, count, width, height):
+        self.buffer = buffer
+        self.offset = offset
+        self.width = width
+        self.height = height
+        self.head = 0
+        self.count = count
+        if count == 0:
+            self.close()
+
+    def close(self):
+        '''closes the memory map; remaining records can no longer be read'''
+        if self.buffer is not None:
+            self.buffer.close()
+            self.buffer = None
+
+    def record(self, i):
+        '''decodes the i-th remaining record'''
+        if self.buffer is None:
+            raise ValueError('Error: upcoming asteroid records are closed')
+        x, y, angle, id, code = record_struct.unpack_from(
+            self.buffer, self.offset + (self.head + i) * record_struct.size)
+        if code >= len(obj_types) or obj_types[code] not in ('asteroid_small',
+                                                            'asteroid_large'):
+            raise ValueError(f'Error: invalid upcoming asteroid record {self.head + i}')
+        return SpaceObject(x, y, self.width, self.height, angle, obj_types[code], id)
+
+    def __len__(self):
+        return self.count - self.head
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self.record(i)
+
+    def pop(self, index=0):
+        if index != 0:
+            raise IndexError('RecordQueue only supports pop(0)')
+        if len(self) == 0:
+            raise IndexError('pop from empty RecordQueue')
+        space_obj = self.record(0)
+        self.head += 1
+        if len(self) == 0:
+            self.close()
+        return space_obj
+
+
+def import_binary_state(engine, game_state_filename):
+    '''fills engine.game_state, asteroid_ls, bullet_ls and upcoming_asteroid_ls
+    from a binary state file'''
+    with open(game_state_filename, 'rb') as f:
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    try:
+        read_binary_state(engine, buffer)
+    except Exception:
+        buffer.close()
+        raise
+
+
+def read_binary_state(engine, buffer):
+    '''sets engine's game state from the memory-mapped file buffer'''
+    if len(buffer) < header_struct.size + record_struct.size:
+        raise ValueError("Error: game state incomplete")
+    (file_magic, file_version, width, height, score, fuel, asteroids_count,
+    bullets_count, upcoming_asteroids_count) = header_struct.unpack_from(buffer, 0)
+    if file_version not in (version, spawner_version):
+        raise ValueError(f'Error: unsupported binary state version {file_version}')
+    if min(asteroids_count, bullets_count, upcoming_asteroids_count) < 0:
+        raise ValueError('Error: invalid object count in header')
+    #upcoming asteroid records, or the spawner line, follow the bullets
+    upcoming_offset = header_struct.size + (1 + asteroids_count + bullets_count) * record_struct.size
+    end = upcoming_offset
+    if file_version == version:
+        end += upcoming_asteroids_count * record_struct.size
+    if len(buffer) < end:
+        raise ValueError("Error: game state incomplete")
+    if file_version == version and len(buffer) > end:
+        raise ValueError('Error: unexpected data after last record')
+
+    def read_records(first, count, accepted_types):
+        space_objs = []
+        for i in range(first, first + count):
+            x, y, angle, id, code = record_struct.unpack_from(
+                buffer, header_struct.size + i * record_struct.size)
+            if code >= len(obj_types) or obj_types[code] not in accepted_types:
+                raise ValueError(f'Error: unexpected object type in record {i}')
+            space_objs.append(SpaceObject(x, y, width, height, angle,
+                                        obj_types[code], id))
+        return space_objs
+
+    engine.game_state = {'width': width,
+                        'height': height,
+                        'score': score,
+                        'spaceship': read_records(0, 1, ['spaceship'])[0],
+                        'fuel': fuel,
+                        'asteroids_count': asteroids_count,
+                        'bullets_count': bullets_count,
+                        'upcoming_asteroids_count': upcoming_asteroids_count}
+    engine.asteroid_ls = read_records(1, asteroids_count,
+                                    ['asteroid_small', 'asteroid_large'])
+    engine.bullet_ls = read_records(1 + asteroids_count, bullets_count, ['bullet'])
+    if file_version == spawner_version:
+        engine.upcoming_asteroid_ls = AsteroidSpawner.from_line(
+            buffer[upcoming_offset:].decode('ascii', 'replace'), upcoming_asteroids_count,
+            engine.game_state['spaceship'], engine.asteroid_ls)
+        buffer.close()
+    else:
+        engine.upcoming_asteroid_ls = RecordQueue(buffer, upcoming_offset,
+                                                upcoming_asteroids_count, width, height)
+
+
+def export_binary_state(engine, game_state_filename, upcoming=True):
+    '''writes engine's game state as a binary state file, without upcoming
+    asteroid records if upcoming is False'''
+    spawner = engine.upcoming_asteroid_ls
+    if not isinstance(spawner, AsteroidSpawner):
+        spawner = None
+    file_version = version if spawner is None else spawner_version
+    #upcoming asteroids may be read from game_state_filename while it is
+    #written, so it is only replaced once the new file is complete
+    temp_filename = game_state_filename + '.tmp'
+    try:
+        with open(temp_filename, 'wb') as f:
+            write_binary_state(f, engine, file_version, spawner, upcoming)
+        os.replace(temp_filename, game_state_filename)
+    except BaseException:
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(temp_filename)
+        raise
+
+
+def write_binary_state(f, engine, file_version, spawner, upcoming=True):
+    '''writes engine's game state to binary file f'''
+    game_state = engine.game_state
+    upcoming_count = len(engine.upcoming_asteroid_ls)
+    if not upcoming and spawner is None:
+        upcoming_count = 0
+    f.write(header_struct.pack(magic, file_version, game_state['width'],
+                            game_state['height'], game_state['score'],
+                            game_state['fuel'], len(engine.asteroid_ls),
+                            len(engine.bullet_ls), upcoming_count))
+    for space_obj in ([game_state['spaceship']] + list(engine.asteroid_ls) +
+                    list(engine.bullet_ls)):
+        f.write(pack_record(space_obj))
+    if spawner is not None:
+        f.write(spawner.line().encode('ascii'))
+        return
+    if not upcoming:
+        return
+    for space_obj in engine.upcoming_asteroid_ls: #may be lazily loaded
+        f.write(pack_record(space_obj))
+
+
+def pack_record(space_obj):
+    return record_struct.pack(space_obj.x, space_obj.y, space_obj.angle,
+                            space_obj.id, type_codes[space_obj.obj_type])
+
+
+def load_records(filename, first, width, height):
+    '''returns RecordQueue of the upcoming asteroid records in filename, a
+    file of records only, from the first-th record'''
+    count = os.path.getsize(filename) // record_struct.size - first
+    if count <= 0:
+        return RecordQueue(None, 0, 0, width, height)
+    with open(filename, 'rb') as f:
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    return RecordQueue(buffer, first * record_struct.size, count, width, height)
+
+
+def convert(input_filename, output_filename):
+    '''converts a text state file to binary or a binary state file to text'''
+    from game_engine import Engine
+    state = Engine.__new__(Engine) #only game state is needed, no player/GUI
+    state.import_state(input_filename)
+    if is_binary_state(input_filename):
+        state.export_state(output_filename)
+    else:
+        export_binary_state(state, output_filename)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) != 3:
+        sys.exit("Usage: python3 binary_state.py <input state> <output state>")
+    convert(sys.argv[1], sys.argv[2])
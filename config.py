@@ -23,3 +23,6 @@ fuel_warning_threshold = (75, 50, 25)
 
 spaceship_fuel_consumption = 1
 bullet_fuel_consumption = 2
+
+# frame tables (frame_table.py) and sweep results (sweep.py) are written here
+cache_dir = "~/.cache/cosmic-warrior"
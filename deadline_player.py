@@ -0,0 +1,187 @@
+"""
+Runs Player.action in a worker thread or process with a per-frame deadline.
+
+    deadline = DeadlinePlayer(0.02, fallback='repeat', mode='thread')
+    game = Engine('examples/game_state_good.txt', Player, GUI,
+                player_deadline=deadline)
+
+The player is constructed inside the worker and given copies of the game
+objects, so it never sees the engine change them. Its action may also be a
+coroutine function (async def). When action does not return within the
+deadline the engine gets the fallback instead: 'repeat' the last action,
+'noop', or a fixed (thrust, left, right, bullet) tuple. No new frame is sent
+to the worker until it has finished; a late result is not used for the frame
+it was computed for, but becomes the last action repeated by 'repeat'.
+"""
+
+import time
+import queue
+import asyncio
+import inspect
+import threading
+import multiprocessing
+from frame_scheduler import copy_space_obj
+from profiler import RollingHistogram
+
+noop_action = (False, False, False, False)
+
+
+def call_action(player, args, loop):
+    '''calls player.action, running it to completion on loop if it is async'''
+    player_input = player.action(*args)
+    if inspect.isawaitable(player_input):
+        player_input = loop.run_until_complete(player_input)
+    return tuple(player_input)
+
+
+def serve(player_class, receive, send):
+    '''worker loop: answers (frame, args) requests with (frame, action) or
+    (frame, exception) until sent None. If player_class raises, every request
+    is answered with its exception'''
+    try:
+        player = player_class()
+        error = None
+    except Exception as e:
+        error = e
+    loop = asyncio.new_event_loop()
+    while True:
+        request = receive()
+        if request is None:
+            break
+        frame, args = request
+        if error is not None:
+            send((frame, error))
+            continue
+        try:
+            send((frame, call_action(player, args, loop)))
+        except Exception as e:
+            send((frame, e))
+    loop.close()
+
+
+class ThreadWorker:
+    def __init__(self, player_class):
+        self.requests = queue.Queue()
+        self.replies = queue.Queue()
+        #daemon so a player stuck past the end of the game does not block exit
+        self.thread = threading.Thread(target=serve, daemon=True,
+                                    args=(player_class, self.requests.get,
+                                            self.replies.put))
+        self.thread.start()
+
+    def send(self, request):
+        self.requests.put(request)
+
+    def receive(self, timeout):
+        try:
+            return self.replies.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        self.requests.put(None)
+
+
+def serve_process(player_class, connection):
+    serve(player_class, connection.recv, connection.send)
+
+
+class ProcessWorker:
+    def __init__(self, player_class):
+        self.connection, child_connection = multiprocessing.Pipe()
+        self.process = multiprocessing.Process(target=serve_process, daemon=True,
+                                            args=(player_class, child_connection))
+        self.process.start()
+
+    def send(self, request):
+        self.connection.send(request)
+
+    def receive(self, timeout):
+        if self.connection.poll(timeout):
+            return self.connection.recv()
+        return None
+
+    def close(self):
+        self.connection.send(None)
+        self.process.join(1)
+        if self.process.is_alive():
+            self.process.terminate()
+
+
+class DeadlinePlayer:
+    def __init__(self, deadline, fallback='repeat', mode='thread'):
+        if mode not in ('thread', 'process'):
+            raise ValueError(f"Error: unknown player mode {mode}")
+        #'repeat', 'noop' or a (thrust, left, right, bullet) tuple
+        if fallback not in ('repeat', 'noop') and (not isinstance(fallback, (tuple, list))
+                                                or len(fallback) != 4):
+            raise ValueError(f"Error: unknown fallback {fallback!r}")
+        self.deadline = deadline
+        self.fallback = fallback
+        self.mode = mode
+        self.worker = None
+        self.last_action = noop_action
+        self.frame = 0
+        self.outstanding = None #frame sent to worker and not yet answered
+        #statistics
+        self.missed = 0 #frames the fallback was used
+        self.busy = 0 #missed frames where the worker was still on an old frame
+        self.latency = RollingHistogram() #ns, actions returned in time
+
+    def start(self, player_class):
+        '''starts worker constructing player_class, called by Engine'''
+        if self.mode == 'thread':
+            self.worker = ThreadWorker(player_class)
+        else:
+            self.worker = ProcessWorker(player_class)
+        return self
+
+    def action(self, spaceship, asteroid_ls, bullet_ls, fuel, score):
+        self.frame += 1
+        if self.outstanding is not None: #late result, used from now on
+            reply = self.worker.receive(0)
+            if reply is not None:
+                self.outstanding = None
+                frame, player_input = reply
+                if isinstance(player_input, Exception):
+                    raise player_input
+                self.last_action = player_input
+
+        if self.outstanding is None:
+            args = (copy_space_obj(spaceship),
+                    [copy_space_obj(asteroid) for asteroid in asteroid_ls],
+                    [copy_space_obj(bullet) for bullet in bullet_ls],
+                    fuel, score)
+            start = time.perf_counter_ns()
+            self.worker.send((self.frame, args))
+            self.outstanding = self.frame
+            reply = self.worker.receive(self.deadline)
+            if reply is not None:
+                self.outstanding = None
+                frame, player_input = reply
+                if isinstance(player_input, Exception):
+                    raise player_input
+                self.latency.add(time.perf_counter_ns() - start)
+                self.last_action = player_input
+                return player_input
+        else:
+            self.busy += 1
+
+        self.missed += 1
+        if self.fallback == 'repeat':
+            return self.last_action
+        if self.fallback == 'noop':
+            return noop_action
+        return tuple(self.fallback)
+
+    def close(self):
+        if self.worker is not None:
+            self.worker.close()
+
+    def report(self):
+        '''returns dict of deadline statistics, latency in ns'''
+        return {'deadline': self.deadline,
+                'frames': self.frame,
+                'missed': self.missed,
+                'busy': self.busy,
+                'latency': self.latency.summary()}
@@ -0,0 +1,56 @@
+class EntityRegistry:
+    '''Space objects keyed by id with O(1) add and remove. Iterates in
+    ascending id order (ties in order added), which sets collision priority.
+    Objects usually arrive in ascending id order; otherwise the registry is
+    re-sorted once, on the next iteration.
+
+    If given game_state and count_key, game_state[count_key] is kept equal to
+    the number of objects'''
+
+    def __init__(self, space_objs=(), game_state=None, count_key=None):
+        self.entities = {} #(id, serial) -> space object
+        self.keys = {} #id() of space object -> (id, serial)
+        self.serial = 0
+        self.last_key = None
+        self.in_order = True
+        self.game_state = game_state
+        self.count_key = count_key
+        for space_obj in space_objs:
+            self.add(space_obj)
+        self.sync_count()
+
+    def sync_count(self):
+        if self.game_state is not None:
+            self.game_state[self.count_key] = len(self.entities)
+
+    def add(self, space_obj):
+        key = (space_obj.id, self.serial)
+        self.serial += 1
+        if self.last_key is not None and key < self.last_key:
+            self.in_order = False
+        else:
+            self.last_key = key
+        self.entities[key] = space_obj
+        self.keys[id(space_obj)] = key
+        self.sync_count()
+
+    def remove(self, space_obj):
+        del self.entities[self.keys.pop(id(space_obj))]
+        self.sync_count()
+
+    def __contains__(self, space_obj):
+        return id(space_obj) in self.keys
+
+    def __len__(self):
+        return len(self.entities)
+
+    def __iter__(self):
+        if not self.in_order:
+            self.entities = dict(sorted(self.entities.items()))
+            self.in_order = True
+        return iter(self.entities.values())
+
+    def view(self):
+        '''returns list of objects in id order; changes to the list do not
+        affect the registry'''
+        return list(self)
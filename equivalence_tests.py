@@ -0,0 +1,269 @@
+"""
+Checks that alternative implementations and formats match Engine, on the
+example state and generated scenarios (see scenario_generator.py) played by
+a seeded random player.
+
+    python3 equivalence_tests.py <test case name>
+    python3 equivalence_tests.py all
+
+Each comparison prints a line; any difference exits with status 1.
+"""
+
+import os
+import sys
+import random
+import tempfile
+from game_engine import Engine
+from events import EventBus
+from scenario_generator import generate_state
+
+failures = []
+skipped = []
+
+
+class RandomPlayer:
+    '''Presses each input at random, the same sequence for every engine'''
+
+    def __init__(self, seed=0):
+        self.rng = random.Random(seed)
+
+    def action(self, spaceship, asteroid_ls, bullet_ls, fuel, score):
+        return tuple(self.rng.random() < p for p in (0.6, 0.3, 0.3, 0.5))
+
+
+def state_files(directory):
+    '''returns the example state and generated scenarios written to directory'''
+    filenames = ['examples/game_state_good.txt']
+    for seed, (asteroids, upcoming, bullets, spawner) in enumerate(
+            [(5, 20, 0, False), (40, 300, 10, False), (200, 50, 30, False),
+            (20, 1000, 5, True)]):
+        filename = os.path.join(directory, f'scenario_{seed}.txt')
+        generate_state(filename, seed, asteroids=asteroids, upcoming=upcoming,
+                    bullets=bullets, fuel=1000, spawner=spawner)
+        filenames.append(filename)
+    return filenames
+
+
+def state_text(engine, directory):
+    '''returns engine's game state as a text state file'''
+    filename = os.path.join(directory, 'export.txt')
+    engine.export_state(filename)
+    with open(filename) as f:
+        return f.read()
+
+
+def state_values(engine):
+    '''returns engine's game state with exact positions, which a text state
+    file rounds'''
+    space_objs = ([engine.game_state['spaceship']] + list(engine.asteroid_ls) +
+                list(engine.bullet_ls))
+    return ([(space_obj.obj_type, space_obj.x, space_obj.y, space_obj.angle,
+            space_obj.id, space_obj.move_count if space_obj.obj_type == 'bullet' else None)
+            for space_obj in space_objs] +
+            [engine.game_state['score'], engine.game_state['fuel'],
+            len(engine.upcoming_asteroid_ls)])
+
+
+def play(engine, frames=None):
+    '''plays frames frames (or until the game ends); returns frames played'''
+    played = 0
+    while frames is None or played < frames:
+        played += 1
+        if engine.step():
+            break
+    return played
+
+
+def check(name, expected, actual):
+    same = expected == actual
+    print(f'{name}: {"same" if same else "DIFFERENT"}')
+    if not same:
+        failures.append(name)
+
+
+def skip(name, reason):
+    print(f'{name}: skipped, {reason}')
+    skipped.append(name)
+
+
+def numpy_installed(name):
+    '''returns whether NumPy is installed, reporting test case name skipped
+    if not; modules needing it exit when imported without it'''
+    try:
+        import numpy
+    except ImportError:
+        skip(name, "'numpy' module is not installed")
+        return False
+    return True
+
+
+def engine_class_matches(engine_class, directory):
+    for filename in state_files(directory):
+        name = os.path.basename(filename)
+        expected = Engine(filename, RandomPlayer, headless=True, events=EventBus())
+        actual = engine_class(filename, RandomPlayer, headless=True, events=EventBus())
+        check(f'{name} frames', play(expected), play(actual))
+        check(f'{name} state', state_values(expected), state_values(actual))
+
+
+def array_engine(directory):
+    if not numpy_installed('array_engine'):
+        return
+    from world_arrays import ArrayEngine
+    engine_class_matches(ArrayEngine, directory)
+
+
+def shoot(directory):
+    '''Player.shoot, vectorized with NumPy, against shoot_loop on every frame
+    of games played by Player'''
+    import player
+    from player import Player
+    if player.np is None: #shoot falls back to shoot_loop, nothing to compare
+        skip('shoot', "'numpy' module is not installed, Player.shoot uses shoot_loop")
+        return
+    for filename in state_files(directory):
+        engine = Engine(filename, Player, headless=True, events=EventBus())
+        player = Player()
+        vectorized = []
+        loop = []
+        while True:
+            spaceship = engine.game_state['spaceship']
+            player.width = spaceship.width
+            player.height = spaceship.height
+            vectorized.append(player.shoot(spaceship, engine.asteroid_ls))
+            loop.append(player.shoot_loop(spaceship, engine.asteroid_ls))
+            if engine.step():
+                break
+        name = os.path.basename(filename)
+        print(f'{name}: {sum(map(bool, loop))} of {len(loop)} frames with shots')
+        check(f'{name} shots', loop, vectorized)
+
+
+def read_file(filename, mode='r'):
+    with open(filename, mode) as f:
+        return f.read()
+
+
+def binary_state(directory):
+    '''text and binary state files converted back and forth, before and
+    during a game'''
+    from binary_state import convert
+    binary_file = os.path.join(directory, 'state.bin')
+    text_file = os.path.join(directory, 'state.txt')
+    for filename in state_files(directory):
+        name = os.path.basename(filename)
+        engine = Engine(filename, RandomPlayer, headless=True, events=EventBus())
+        convert(filename, binary_file)
+        convert(binary_file, text_file)
+        check(f'{name} text to binary to text', state_text(engine, directory),
+            read_file(text_file))
+        binary = read_file(binary_file, 'rb')
+        convert(text_file, binary_file)
+        check(f'{name} binary to text to binary', binary, read_file(binary_file, 'rb'))
+
+        play(engine, 30)
+        engine.export_state(binary_file, binary=True)
+        loaded = Engine(binary_file, RandomPlayer, headless=True, events=EventBus())
+        check(f'{name} saved as binary after 30 frames', state_text(engine, directory),
+            state_text(loaded, directory))
+        loaded.export_state(binary_file, binary=True) #over the file it reads
+        check(f'{name} saved over its own binary file', state_text(engine, directory),
+            state_text(Engine(binary_file, RandomPlayer, headless=True,
+                            events=EventBus()), directory))
+
+
+def replay_seek(directory):
+    '''states reached by Replay.seek against the recorded game'''
+    from replay import Recorder, Replay
+    for i, filename in enumerate(state_files(directory)):
+        name = os.path.basename(filename)
+        recording = os.path.join(directory, f'recording_{i}')
+        engine = Engine(filename, RandomPlayer, headless=True, events=EventBus(),
+                        recorder=Recorder(recording, checkpoint_interval=25))
+        states = [state_values(engine)]
+        while not engine.step():
+            states.append(state_values(engine))
+        states.append(state_values(engine))
+        engine.recorder.close()
+
+        replay = Replay(recording)
+        check(f'{name} recorded frames', len(states) - 1, len(replay))
+        for frame in sorted({0, 1, 24, 25, 26, 49, 60, len(replay)}):
+            if frame <= len(replay):
+                check(f'{name} seek({frame})', states[frame],
+                    state_values(replay.seek(frame)))
+
+
+def batch_engine(directory):
+    '''every scenario as a world of one BatchEngine, each world given the
+    inputs of its own random player'''
+    if not numpy_installed('batch_engine'):
+        return
+    from batch_engine import BatchEngine
+    filenames = state_files(directory)
+    batch = BatchEngine(filenames)
+    players = [RandomPlayer(seed) for seed in range(len(filenames))]
+    while not batch.done.all():
+        batch.step([(False,) * 4 if done else player.action(None, None, None, None, None)
+                    for player, done in zip(players, batch.done)])
+    for world, filename in enumerate(filenames):
+        name = os.path.basename(filename)
+        engine = Engine(filename, lambda: RandomPlayer(world), headless=True,
+                        events=EventBus())
+        play(engine)
+        check(f'{name} frames', engine.frame_count, int(batch.frame_count[world]))
+        check(f'{name} state', state_values(engine),
+            state_values(batch.world_state(world)))
+
+
+def upcoming_values(engine):
+    '''returns every remaining upcoming asteroid, removing them'''
+    upcoming = engine.upcoming_asteroid_ls
+    return [(space_obj.obj_type, space_obj.x, space_obj.y, space_obj.angle,
+            space_obj.id) for space_obj in (upcoming.pop(0) for _ in range(len(upcoming)))]
+
+
+def spawner_resume(directory):
+    '''asteroids spawned after a game is saved and loaded, as text and as
+    binary, against those of the game played on'''
+    from asteroid_spawner import AsteroidSpawner
+    saved_file = os.path.join(directory, 'saved')
+    for filename in state_files(directory):
+        engine = Engine(filename, RandomPlayer, headless=True, events=EventBus())
+        if not isinstance(engine.upcoming_asteroid_ls, AsteroidSpawner):
+            continue
+        name = os.path.basename(filename)
+        play(engine, 60)
+        resumed = {}
+        for binary in (False, True):
+            engine.export_state(saved_file, binary)
+            resumed[binary] = upcoming_values(Engine(saved_file, RandomPlayer,
+                                                    headless=True, events=EventBus()))
+        expected = upcoming_values(engine)
+        for binary, kind in ((False, 'text'), (True, 'binary')):
+            check(f'{name} {len(expected)} upcoming after {kind} save', expected,
+                resumed[binary])
+
+
+TESTCASES = {"array_engine": array_engine,
+             "shoot": shoot,
+             "binary_state": binary_state,
+             "replay_seek": replay_seek,
+             "batch_engine": batch_engine,
+             "spawner_resume": spawner_resume}
+
+if len(sys.argv) != 2:
+    sys.exit("Usage: python3 equivalence_tests.py <test case name>")
+
+if sys.argv[1] != 'all' and sys.argv[1] not in TESTCASES:
+    sys.exit(f"Invalid test case: {sys.argv[1]}")
+
+with tempfile.TemporaryDirectory() as directory:
+    for name, testcase in TESTCASES.items():
+        if sys.argv[1] in ('all', name):
+            print(f'== {name}')
+            testcase(directory)
+if skipped:
+    print(f'{len(skipped)} skipped: {", ".join(skipped)}')
+if failures:
+    sys.exit(f'{len(failures)} differences')
@@ -0,0 +1,161 @@
+"""
+Typed game events and the sinks they are sent to.
+
+Engine emits an event for everything it used to print, each carrying the
+frame it happened in:
+    Hit(frame, bullet_id, asteroid_id, score)
+    Collision(frame, asteroid_id, score)
+    Spawn(frame, asteroid_id)
+    FuelWarning(frame, threshold, fuel)
+    ShotRefused(frame, fuel)
+    GameOver(frame, reason, score)     reason 'fuel' or 'asteroids'
+
+Pass an EventBus to Engine to choose where they go:
+
+    ring = RingBuffer(10000)
+    game = Engine('examples/game_state_good.txt', Player,
+                events=EventBus([ring, JsonlSink('events.jsonl')]))
+
+Without one, events go to StdoutSink, which prints the same text as before.
+EventBus() with no sinks discards them.
+"""
+
+import json
+import queue
+import threading
+from collections import namedtuple, deque
+
+Hit = namedtuple('Hit', 'frame bullet_id asteroid_id score')
+Collision = namedtuple('Collision', 'frame asteroid_id score')
+Spawn = namedtuple('Spawn', 'frame asteroid_id')
+FuelWarning = namedtuple('FuelWarning', 'frame threshold fuel')
+ShotRefused = namedtuple('ShotRefused', 'frame fuel')
+GameOver = namedtuple('GameOver', 'frame reason score')
+
+event_names = {Hit: 'hit',
+            Collision: 'collision',
+            Spawn: 'spawn',
+            FuelWarning: 'fuel_warning',
+            ShotRefused: 'shot_refused',
+            GameOver: 'game_over'}
+
+
+def event_text(event):
+    '''returns the line Engine used to print for event, or None'''
+    kind = type(event)
+    if kind is Hit:
+        #triple quotes to avoid conflict with dict key
+        return (f'''Score: {event.score} \t '''
+                f'''[Bullet {event.bullet_id} has shot asteroid {event.asteroid_id}]''')
+    if kind is Collision:
+        return (f'''Score: {event.score} \t [Spaceship'''
+                f''' collided with asteroid {event.asteroid_id}]''')
+    if kind is Spawn:
+        return f'Added asteroid {event.asteroid_id}'
+    if kind is FuelWarning:
+        return f'{event.threshold:02}% fuel warning: {event.fuel} remaining'
+    if kind is ShotRefused:
+        return 'Cannot shoot due to low fuel'
+    if kind is GameOver and event.reason == 'asteroids':
+        return 'Error: no more asteroids available'
+    return None
+
+
+def event_dict(event):
+    '''returns event as a dict with its name under 'event', for JSON'''
+    return {'event': event_names[type(event)], **event._asdict()}
+
+
+class EventBus:
+    def __init__(self, sinks=()):
+        self.sinks = list(sinks)
+
+    def add_sink(self, sink):
+        self.sinks.append(sink)
+
+    def emit(self, event):
+        for sink in self.sinks:
+            sink.write(event)
+
+    def close(self):
+        for sink in self.sinks:
+            sink.close()
+
+
+class StdoutSink:
+    '''Prints events as Engine's original text, immediately so it stays in
+    order with anything else printed'''
+
+    def write(self, event):
+        text = event_text(event)
+        if text is not None:
+            print(text)
+
+    def close(self):
+        pass
+
+
+class RingBuffer:
+    '''Keeps the last capacity events in memory'''
+
+    def __init__(self, capacity=10000):
+        self.buffer = deque(maxlen=capacity)
+        self.dropped = 0 #events pushed out by newer ones
+
+    def write(self, event):
+        if len(self.buffer) == self.buffer.maxlen:
+            self.dropped += 1
+        self.buffer.append(event)
+
+    def events(self, kind=None):
+        '''returns list of buffered events, optionally only those of kind
+        (an event type or name)'''
+        if kind is None:
+            return list(self.buffer)
+        if isinstance(kind, str):
+            return [event for event in self.buffer
+                    if event_names[type(event)] == kind]
+        return [event for event in self.buffer if type(event) is kind]
+
+    def close(self):
+        pass
+
+
+class JsonlSink:
+    '''Writes events as JSON lines from a background thread, a batch of up
+    to batch_size lines at a time'''
+
+    def __init__(self, filename, batch_size=256):
+        self.file = open(filename, 'w')
+        self.batch_size = batch_size
+        self.queue = queue.SimpleQueue()
+        self.thread = threading.Thread(target=self.writer, daemon=True)
+        self.thread.start()
+
+    def write(self, event):
+        self.queue.put(event)
+
+    def writer(self):
+        closed = False
+        while not closed:
+            batch = [self.queue.get()] #wait for the next event
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            if batch[-1] is None: #close
+                batch.pop()
+                closed = True
+            self.file.writelines(json.dumps(event_dict(event)) + '\n'
+                                for event in batch)
+            self.file.flush()
+
+    def close(self):
+        '''writes remaining events and closes the file'''
+        if self.thread is None:
+            return
+        self.queue.put(None)
+        self.thread.join()
+        self.thread = None
+        self.file.close()
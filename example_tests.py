@@ -1,7 +1,6 @@
 import sys
 from game_engine import Engine
 from space_object import SpaceObject
-from gui import GUI
 
 
 class ExamplePlayer:
@@ -53,7 +52,7 @@ def example_spaceobject_3():
 
 
 def example_game_basic():
-    game = Engine('examples/basic_state.txt', ExamplePlayer, GUI)
+    game = Engine('examples/basic_state.txt', ExamplePlayer, headless=True)
     game.run_game()
 
 
@@ -0,0 +1,140 @@
+"""
+Fixed-timestep scheduling for Engine.run_game.
+
+Game logic advances exactly once per config.frame_delay of wall time. The time
+spent on the player, game logic and rendering is subtracted from the wait, so
+the frame rate holds as load grows. When a frame overruns, missed logic steps
+are caught up back to back (up to max_catch_up) and the renders between them
+are skipped. Optionally rendering runs on its own thread, drawing the latest
+of two snapshot buffers so the game loop never waits for the display.
+"""
+
+import time
+import threading
+import config
+from space_object import SpaceObject
+from profiler import RollingHistogram
+
+
+def copy_space_obj(space_obj):
+    space_obj_copy = SpaceObject(space_obj.x, space_obj.y, space_obj.width, 
+                                space_obj.height, space_obj.angle, 
+                                space_obj.obj_type, space_obj.id)
+    if space_obj.obj_type == 'bullet': #age of bullet
+        space_obj_copy.move_count = space_obj.move_count
+    return space_obj_copy
+
+
+def snapshot(engine):
+    '''returns GUI.update_frame arguments copied from engine's current state'''
+    return (copy_space_obj(engine.game_state['spaceship']),
+            [copy_space_obj(asteroid) for asteroid in engine.asteroid_ls],
+            [copy_space_obj(bullet) for bullet in engine.bullet_ls],
+            engine.game_state['score'],
+            engine.game_state['fuel'])
+
+
+class RenderThread:
+    '''Draws snapshots on a background thread. A snapshot submitted while the
+    previous one is still waiting replaces it and counts as dropped. Window
+    events are left to the main thread'''
+
+    def __init__(self, gui):
+        #GUI.draw_frame only draws, renderers without it only have update_frame
+        self.draw = getattr(gui, 'draw_frame', gui.update_frame)
+        self.condition = threading.Condition()
+        self.pending = None #back buffer, front buffer is the one being drawn
+        self.stopped = False
+        self.dropped = 0
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def submit(self, frame_snapshot):
+        with self.condition:
+            if self.pending is not None:
+                self.dropped += 1
+            self.pending = frame_snapshot
+            self.condition.notify()
+
+    def run(self):
+        while True:
+            with self.condition:
+                while self.pending is None and not self.stopped:
+                    self.condition.wait()
+                if self.pending is None: #stopped with nothing left to draw
+                    return
+                frame_snapshot, self.pending = self.pending, None
+            self.draw(*frame_snapshot)
+
+    def stop(self):
+        with self.condition:
+            self.stopped = True
+            self.condition.notify()
+        self.thread.join()
+
+
+class FixedTimestep:
+    def __init__(self, frame_delay=None, max_catch_up=5, render_thread=False):
+        self.frame_delay = config.frame_delay if frame_delay is None else frame_delay
+        self.max_catch_up = max_catch_up
+        self.render_thread = render_thread
+        #lateness of each logic step against its scheduled time
+        self.jitter = RollingHistogram()
+        self.skipped_renders = 0 #renders skipped while catching up
+        self.dropped_steps = 0 #steps abandoned when too far behind
+        self.dropped_renders = 0 #snapshots replaced before the render thread drew them
+
+    def run(self, engine):
+        '''runs engine's game loop until the game is over; returns True if
+        it stopped because the window was closed'''
+        renderer = RenderThread(engine.GUI) if self.render_thread else None
+        #with a render thread, window events are handled here on the main thread
+        poll_events = getattr(engine.GUI, 'poll_events', None) if renderer else None
+        window_closed = False
+        clock = time.perf_counter
+        next_time = clock()
+        #with no frame delay every step is rendered
+        max_steps = self.max_catch_up if self.frame_delay > 0 else 1
+        Done = False
+        try:
+            while not Done:
+                if poll_events is not None and poll_events():
+                    window_closed = True
+                    break
+                steps = 0
+                while not Done and clock() >= next_time:
+                    if steps == max_steps: #too far behind, resync clock
+                        if self.frame_delay > 0:
+                            behind = clock() - next_time
+                            self.dropped_steps += int(behind / self.frame_delay)
+                        next_time = clock()
+                        break
+                    self.jitter.add(int((clock() - next_time) * 1e9))
+                    Done = engine.step()
+                    steps += 1
+                    next_time += self.frame_delay
+
+                if steps:
+                    self.skipped_renders += steps - 1
+                    if renderer is None:
+                        engine.render()
+                    else:
+                        renderer.submit(snapshot(engine))
+
+                #wait out the rest of the frame
+                delay = next_time - clock()
+                if delay > 0 and not Done:
+                    time.sleep(delay)
+        finally:
+            if renderer is not None:
+                renderer.stop()
+                self.dropped_renders = renderer.dropped
+        return window_closed
+
+    def report(self):
+        '''returns dict of frame pacing statistics, jitter in ns'''
+        return {'frame_delay': self.frame_delay,
+                'jitter': self.jitter.summary(),
+                'skipped_renders': self.skipped_renders,
+                'dropped_steps': self.dropped_steps,
+                'dropped_renders': self.dropped_renders}
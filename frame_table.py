@@ -0,0 +1,154 @@
+"""
+Precomputed lookup table for Player.frame_estimate.
+
+frame_estimate only depends on the distance to the target, the angle between
+the spaceship's heading and the target (0 to 180 degrees) and config values,
+so it is sampled once over a grid of (distance, angle). The estimate is in
+whole frames and turns, so where the four samples around an input agree the
+table answers with their value, and near a step between values (about 15% of
+inputs) lookup returns None and the estimate is calculated. Compared to the
+analytic estimate, frames are within frames_tolerance and turns within
+turns_tolerance in the table's range; with the default turning radius no
+differences are found. Check a table against the estimate with
+`python3 frame_table.py`.
+
+Tables are cached in cache_dir, config.cache_dir (by default
+~/.cache/cosmic-warrior), one file per set of config values and grid sizes,
+and loaded with mmap. A table file is two float32 planes, frames then
+turns, each a row of angles per distance. Samples the estimate cannot be
+computed for (distances too small for the turning circle) are NaN and
+calculated analytically instead.
+"""
+
+import os
+import sys
+import math
+import mmap
+import array
+import hashlib
+import random
+import tempfile
+import config
+
+cache_dir = os.path.expanduser(config.cache_dir)
+format_version = 1
+#a step can pass between samples which agree, on angles of exactly 90
+frames_tolerance = 1
+turns_tolerance = 0
+
+
+def table_key(turning_radius, dist_step, angle_step, max_dist):
+    '''returns hash of everything the table's values depend on'''
+    values = (format_version, turning_radius, config.speed['spaceship'],
+            config.angle_increment, dist_step, angle_step, max_dist)
+    return hashlib.sha1(repr(values).encode()).hexdigest()[:16]
+
+
+class FrameTable:
+    def __init__(self, buffer, dist_step, angle_step, max_dist):
+        self.dist_step = dist_step
+        self.angle_step = angle_step
+        self.max_dist = max_dist
+        self.dists = int(max_dist // dist_step) + 1
+        self.angles = int(180 // angle_step) + 1
+        #float32 planes, row per distance: frames then turns
+        samples = memoryview(buffer).cast('f')
+        self.frames = samples[:self.dists * self.angles]
+        self.turns = samples[self.dists * self.angles:]
+
+    @classmethod
+    def load(cls, estimate, turning_radius, dist_step=1, angle_step=1,
+            max_dist=2048, directory=None):
+        '''returns table for estimate(dist, angle) -> (frames, turns), loading
+        it from the cache or building and caching it'''
+        directory = cache_dir if directory is None else directory
+        filename = os.path.join(directory, 'frame_table_' +
+                                table_key(turning_radius, dist_step, angle_step,
+                                        max_dist) + '.bin')
+        size = (int(max_dist // dist_step) + 1) * (int(180 // angle_step) + 1) * 8
+        if os.path.isfile(filename) and os.path.getsize(filename) == size:
+            with open(filename, 'rb') as f:
+                buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            buffer = cls.build(estimate, dist_step, angle_step, max_dist)
+            try:
+                cls.save(buffer, filename)
+            except OSError: #cache not writable, table is only kept in memory
+                pass
+        return cls(buffer, dist_step, angle_step, max_dist)
+
+    @staticmethod
+    def build(estimate, dist_step, angle_step, max_dist):
+        '''returns table file contents'''
+        frames_plane = array.array('f')
+        turns_plane = array.array('f')
+        for i in range(int(max_dist // dist_step) + 1):
+            for j in range(int(180 // angle_step) + 1):
+                try:
+                    frames, turns = estimate(i * dist_step, j * angle_step)
+                except (ValueError, ZeroDivisionError):
+                    frames, turns = math.nan, math.nan
+                frames_plane.append(frames)
+                turns_plane.append(turns)
+        return frames_plane.tobytes() + turns_plane.tobytes()
+
+    @staticmethod
+    def save(buffer, filename):
+        #written to a temporary file and renamed so other processes never
+        #load a partly written table
+        os.makedirs(os.path.dirname(filename), exist_ok=True)
+        fd, temp_filename = tempfile.mkstemp(dir=os.path.dirname(filename))
+        with os.fdopen(fd, 'wb') as f:
+            f.write(buffer)
+        os.replace(temp_filename, filename)
+
+    def lookup(self, dist, angle):
+        '''returns (frames, turns) for dist and angle (0 to 180), or None if
+        outside the table or near a step in the estimate'''
+        x = dist / self.dist_step
+        y = angle / self.angle_step
+        i = int(x)
+        j = int(y)
+        angles = self.angles
+        if x < 0 or i + 1 >= self.dists or y < 0 or j >= angles:
+            return None
+        if j == angles - 1: #angle of exactly 180
+            j -= 1
+        #only cells whose corners all agree are answered from the table,
+        #the estimate steps between whole frames and turns inside the others
+        k = i * angles + j
+        frames = self.frames[k]
+        turns = self.turns[k]
+        for corner in (k + 1, k + angles, k + angles + 1):
+            if self.frames[corner] != frames or self.turns[corner] != turns:
+                return None
+        if frames != frames: #NaN, estimate not defined at the corners
+            return None
+        return frames, int(turns)
+
+def check(table, estimate, samples=100000, seed=0):
+    '''returns largest (frames, turns) differences between table and
+    estimate(dist, angle) over random inputs in the table's range'''
+    rng = random.Random(seed)
+    frames_error = 0
+    turns_error = 0
+    for _ in range(samples):
+        dist = rng.uniform(0, table.max_dist)
+        angle = rng.uniform(0, 180)
+        interpolated = table.lookup(dist, angle)
+        if interpolated is None:
+            continue
+        frames, turns = estimate(dist, angle)
+        frames_error = max(frames_error, abs(interpolated[0] - frames))
+        turns_error = max(turns_error, abs(interpolated[1] - turns))
+    return frames_error, turns_error
+
+
+if __name__ == '__main__':
+    from player import Player
+    player = Player()
+    frames_error, turns_error = check(player.frame_table,
+                                    player.relative_frame_estimate)
+    print(f'Largest error: {frames_error:.3f} frames, {turns_error:g} turns')
+    if frames_error > frames_tolerance or turns_error > turns_tolerance:
+        sys.exit(1)
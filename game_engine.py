@@ -1,17 +1,71 @@
+import os
+import contextlib
 import config
 from space_object import SpaceObject
+from null_gui import NullGUI
+from spatial_hash import SpatialHash
+from binary_state import is_binary_state, import_binary_state, export_binary_state
+from upcoming_queue import StreamingQueue
+from asteroid_spawner import AsteroidSpawner, spawner_key
+from frame_scheduler import FixedTimestep
+from entity_registry import EntityRegistry
+from events import (EventBus, StdoutSink, Hit, Collision, Spawn, FuelWarning,
+                    ShotRefused, GameOver)
 
 class Engine:
-    def __init__(self, game_state_filename, player_class, gui_class):
-        self.asteroid_ls = []
-        self.bullet_ls = []
-        self.upcoming_asteroid_ls = []
+    def __init__(self, game_state_filename, player_class, gui_class=None,
+                headless=False, recorder=None, profiler=None, scheduler=None,
+                player_deadline=None, events=None):
         self.import_state(game_state_filename)
-        self.player = player_class()
+        #game events go to events.EventBus sinks, printed by default
+        self.events = events if events is not None else EventBus([StdoutSink()])
+        #optional deadline_player.DeadlinePlayer running the player in a worker
+        self.player_deadline = player_deadline
+        if player_deadline is not None:
+            self.player = player_deadline.start(player_class)
+        else:
+            self.player = player_class()
+        #optional replay.Recorder logging each frame's player input
+        self.recorder = recorder
+        if recorder is not None:
+            self.player = recorder.wrap(self, self.player)
+        #headless mode skips rendering and frame pacing, so run_game runs as
+        #fast as the simulation allows
+        self.headless = headless or gui_class is None
+        if self.headless:
+            gui_class = NullGUI
         self.GUI = gui_class(self.game_state['width'], self.game_state['height'])
+        #frame pacing when rendering, see frame_scheduler.py
+        self.scheduler = scheduler
+        if self.scheduler is None and not self.headless:
+            self.scheduler = FixedTimestep()
         self.fuel_warning_count = 0
+        #run statistics
+        self.frame_count = 0
+        self.hit_count = 0
+        self.collision_count = 0
+        #optional profiler.FrameProfiler timing each phase of the game loop
+        self.profiler = profiler
+        if profiler is not None:
+            profiler.attach(self)
 
     def import_state(self, game_state_filename):
+        '''loads game state from a text or binary (see binary_state.py) state
+        file'''
+        if is_binary_state(game_state_filename):
+            import_binary_state(self, game_state_filename)
+        else:
+            self.import_text_state(game_state_filename)
+
+        #update bullet id counter
+        self.bullet_id_counter = max([bullet.id for bullet in self.bullet_ls], default = -1)
+
+        #max fuel
+        self.max_fuel = self.game_state['fuel']
+
+    def import_text_state(self, game_state_filename):
+        asteroid_ls = []
+        bullet_ls = []
     
         try: #open game_state file
             f = open(game_state_filename, 'r')
@@ -46,47 +100,91 @@ class Engine:
                 except ValueError:
                     raise ValueError(f'Error: invalid data type in line {line_counter}')
 
+            #upcoming asteroids are the last section of the file, they are
+            #streamed from the file as they are needed rather than loaded here.
+            #The queue also checks for EOF once they have all been read.
+            #Alternatively a spawner line generates them, see asteroid_spawner.py
+            if key == 'upcoming_asteroids_count':
+                position = f.tell()
+                line = f.readline()
+                if line.startswith(spawner_key + ' '):
+                    self.upcoming_asteroid_ls = AsteroidSpawner.from_line(
+                        line, self.game_state[key], self.game_state['spaceship'],
+                        asteroid_ls, line_counter + 1)
+                    key_value = f.readline().strip().split(' ') #Check EOF
+                    if key_value != ['']:
+                        raise ValueError(f'Error: unexpected key: {key_value[0]} in line {line_counter + 2}')
+                else:
+                    self.upcoming_asteroid_ls = StreamingQueue(
+                        self, game_state_filename, position, self.game_state[key], 
+                        line_counter)
+
             #certain keys indicate space_objects are in the following lines
-            if key in ('asteroids_count', 'bullets_count', 'upcoming_asteroids_count'):
+            elif key in ('asteroids_count', 'bullets_count'):
                 #check type of space_object
                 #generate list of accepted keys
                 if key == 'asteroids_count':
                     key_ls = ['asteroid_small', 'asteroid_large']
-                elif key == 'bullets_count':
-                    key_ls = ['bullet']
                 else:
-                    key_ls = ['upcoming_asteroid_small', 'upcoming_asteroid_large']
+                    key_ls = ['bullet']
 
                 for _ in range(self.game_state[key]): #expected number of objects
                     line_counter += 1
                     space_obj_key_value = self.get_key_value(key_ls, f, line_counter)
                     space_obj = self.import_space_obj(space_obj_key_value, line_counter)
                     if key_value[0] == 'asteroids_count':
-                        self.asteroid_ls.append(space_obj)
-                    elif key_value[0] == 'bullets_count':
-                        self.bullet_ls.append(space_obj)
+                        asteroid_ls.append(space_obj)
                     else:
-                        self.upcoming_asteroid_ls.append(space_obj)
+                        bullet_ls.append(space_obj)
 
-        #Check EOF                
-        line_counter +=1
-        key_value = f.readline().strip().split(' ')
-        if key_value != ['']:
-            raise ValueError(f'Error: unexpected key: {key_value[0]} in line {line_counter}')
         f.close()
-        f.close()
-
-        
-        #update bullet id counter
-        self.bullet_id_counter = max([bullet.id for bullet in self.bullet_ls], default = -1)
-
-        #max fuel
-        self.max_fuel = self.game_state['fuel']
-
-
-    def export_state(self, game_state_filename):
-        
-        f = open(game_state_filename, 'w')
+        self.asteroid_ls = asteroid_ls
+        self.bullet_ls = bullet_ls
+
+    #asteroids and bullets are held in EntityRegistry objects, asteroid_ls and
+    #bullet_ls give them as lists (in id order) and replace them from lists
+    @property
+    def asteroid_ls(self):
+        return self.asteroids.view()
+
+    @asteroid_ls.setter
+    def asteroid_ls(self, asteroid_ls):
+        self.asteroids = EntityRegistry(asteroid_ls)
+
+    @property
+    def bullet_ls(self):
+        return self.bullets.view()
+
+    @bullet_ls.setter
+    def bullet_ls(self, bullet_ls):
+        self.bullets = EntityRegistry(bullet_ls, self.game_state, 'bullets_count')
+
+
+    def export_state(self, game_state_filename, binary=False):
+        if binary:
+            export_binary_state(self, game_state_filename)
+            return
+
+        #upcoming asteroids may be streamed from game_state_filename, so it is
+        #written to a temporary file which then replaces it
+        queue = self.upcoming_asteroid_ls
+        rewritten = isinstance(queue, StreamingQueue) and queue.reads(game_state_filename)
+        temp_filename = game_state_filename + '.tmp'
+        try:
+            with open(temp_filename, 'w') as f:
+                position = self.write_text_state(f)
+            os.replace(temp_filename, game_state_filename)
+        except BaseException:
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(temp_filename)
+            raise
+        if rewritten: #the remaining asteroids now follow the count line
+            queue.reopen(game_state_filename, position, len(self.game_state) + 
+                        len(self.asteroid_ls) + len(self.bullet_ls))
+
+    def write_text_state(self, f):
+        '''writes game state to text file f; returns the position after the
+        upcoming_asteroids_count line'''
         for key in self.game_state:
             if key == 'spaceship':
                 f.write(str(self.game_state['spaceship']) + '\n')
@@ -100,132 +198,235 @@ class Engine:
                     for bullet in self.bullet_ls:
                         f.write(str(bullet) + '\n')
                 elif key == 'upcoming_asteroids_count':
-                    for asteroid in self.upcoming_asteroid_ls:
-                        f.write('upcoming_' + str(asteroid) + '\n')
-        
-        f.close()
+                    position = f.tell()
+                    if isinstance(self.upcoming_asteroid_ls, AsteroidSpawner):
+                        f.write(self.upcoming_asteroid_ls.line() + '\n')
+                    else:
+                        for asteroid in self.upcoming_asteroid_ls:
+                            f.write('upcoming_' + str(asteroid) + '\n')
+        return position
 
     def run_game(self):
 
-        Done = False
-        while not Done:
-            # 1. Receive player input -> (thrust, left, right, bullet)
-            player_input = self.player.action(self.game_state['spaceship'], 
-                                            self.asteroid_ls, 
-                                            self.bullet_ls, 
-                                            self.game_state['fuel'], 
-                                            self.game_state['score'])
-            thrust, left, right, bullet = player_input
-            # 2. Process game logic
-            # Player movement input
-            if left:
-                self.game_state['spaceship'].turn_left()
-            if right:
-                self.game_state['spaceship'].turn_right()
-            if thrust:
-                self.game_state['spaceship'].move_forward()
-
-            bullet_shot = False #variable to keep track of bullet firing for deducting fuel later
-            if bullet: #attempt shoot bullet
-                if self.game_state['fuel'] < config.shoot_fuel_threshold: #not enough fuel
-                    print('Cannot shoot due to low fuel')
-                else: #bullet succesfully shot
-                    #inherit spaceship position
-                    new_bullet_x, new_bullet_y = self.game_state['spaceship'].get_xy()
-                    new_bullet_angle = self.game_state['spaceship'].angle
-
-                    self.bullet_id_counter += 1
-                    new_bullet = SpaceObject(
-                        new_bullet_x, new_bullet_y, self.game_state['width'], 
-                        self.game_state['height'], new_bullet_angle, 'bullet', 
-                        self.bullet_id_counter)
-
-                    self.bullet_ls.append(new_bullet) #add bullet to list
-                    self.game_state['bullets_count'] += 1
-                    bullet_shot = True
-
-            #Update positions asteroids, bullets
-            for asteroid in self.asteroid_ls:
-                asteroid.move_forward()
-
-            bullet_ls_2 = self.bullet_ls.copy() #create copy to iterate through
-            for bullet in bullet_ls_2:
-                if bullet.move_count >= config.bullet_move_count:
-                    self.bullet_ls.remove(bullet)
-                    self.game_state['bullets_count'] -= 1
-                else:
-                    bullet.move_forward()
-            #Deduct fuel
-            if bullet_shot: #use variable rather than player input as attempt 
-                            #to shoot can fail
-                self.game_state['fuel'] -= config.bullet_fuel_consumption
-            self.game_state['fuel'] -= config.spaceship_fuel_consumption
-
-            #Fuel warning
-            percent_fuel = self.game_state['fuel']/self.max_fuel * 100
-            
-            if self.fuel_warning_count < len(config.fuel_warning_threshold):
-                current_fuel_warn_thresh = config.fuel_warning_threshold[self.fuel_warning_count]
-                if percent_fuel <= current_fuel_warn_thresh:
-                    #triple quotes to avoid conflict with dict key
-                    print(f'''{current_fuel_warn_thresh:02}% fuel warning: ''' 
-                        f'''{self.game_state['fuel']} remaining''')
-                    self.fuel_warning_count += 1
-
-            elif self.game_state['fuel'] <= 0:
-                Done = True
-
-            #Detect collisions bullet v asteroid
-            #asteroid_ls as main loop as low asteroid id takes priority
-            asteroid_ls_2 = self.asteroid_ls.copy() #create copy to iterate through
-            for asteroid in asteroid_ls_2: 
-                for bullet in self.bullet_ls:
-                    if bullet.collide_with(asteroid):
-                        if asteroid.obj_type == 'asteroid_small':
-                            self.game_state['score'] += config.shoot_small_ast_score
-                        else:
-                            self.game_state['score'] += config.shoot_large_ast_score
-                        print(f'''Score: {self.game_state['score']} \t '''
-                            f'''[Bullet {bullet.id} has shot asteroid {asteroid.id}]''')
-                        self.asteroid_ls.remove(asteroid)
-                        self.bullet_ls.remove(bullet)
-                        self.game_state['bullets_count'] -= 1
-                        break
-
-            #asteroid v spaceship
-            asteroid_ls_2 = self.asteroid_ls.copy()
-            for asteroid in asteroid_ls_2:
-                if asteroid.collide_with(self.game_state['spaceship']):
-                    self.game_state['score'] += config.collide_score
-                    print(f'''Score: {self.game_state['score']} \t [Spaceship'''
-                        f''' collided with asteroid {asteroid.id}]''')
-                    self.asteroid_ls.remove(asteroid)
-
-            #Replenish asteroids
-            while len(self.asteroid_ls) < self.game_state['asteroids_count']:
-                if len(self.upcoming_asteroid_ls) == 0: #check if any asteroids available
-                    self.game_state['asteroids_count'] = len(self.asteroid_ls)
-                    Done = True #end game if no asteroids
-                    print('Error: no more asteroids available')
-                    break
-                self.asteroid_ls.append(self.upcoming_asteroid_ls.pop(0))
-                print(f'Added asteroid {self.asteroid_ls[-1].id}')
-                self.game_state['upcoming_asteroids_count'] -= 1
-
-
-
-            # 3. Draw the game state on screen using the GUI class
-            self.GUI.update_frame(
-                self.game_state['spaceship'], 
-                self.asteroid_ls, 
-                self.bullet_ls, 
-                self.game_state['score'], 
-                self.game_state['fuel'])
-
+        #recording, player worker and events are closed however the game
+        #ends, including the GUI exiting when its window is closed
+        window_closed = False
+        try:
+            if self.scheduler is not None: #paced to frame_delay
+                window_closed = self.scheduler.run(self)
+            else: #headless, as fast as possible
+                Done = False
+                while not Done:
+                    Done = self.step()
+                    self.render()
+        finally:
+            if self.recorder is not None:
+                self.recorder.close()
+            if self.player_deadline is not None:
+                self.player_deadline.close()
+            self.events.close()
+
+        if window_closed:
+            self.GUI.window_closed()
 
         # Display final score
         self.GUI.finish(self.game_state['score'])
 
+    def step(self):
+        '''plays one frame without drawing it; returns True when game is over'''
+        # 1. Receive player input -> (thrust, left, right, bullet)
+        player_input = self.player.action(self.game_state['spaceship'], 
+                                        self.asteroid_ls, 
+                                        self.bullet_ls, 
+                                        self.game_state['fuel'], 
+                                        self.game_state['score'])
+        # 2. Process game logic
+        return self.update(player_input)
+
+    def render(self):
+        # 3. Draw the game state on screen using the GUI class
+        self.GUI.update_frame(
+            self.game_state['spaceship'], 
+            self.asteroid_ls, 
+            self.bullet_ls, 
+            self.game_state['score'], 
+            self.game_state['fuel'])
+
+    def update(self, player_input):
+        '''advances game logic by one frame given player input; returns True
+        when the game is over'''
+        thrust, left, right, bullet = player_input
+        self.frame_count += 1
+
+        # Player movement input
+        self.move_spaceship(thrust, left, right)
+
+        bullet_shot = False #variable to keep track of bullet firing for deducting fuel later
+        if bullet: #attempt shoot bullet
+            bullet_shot = self.shoot_bullet()
+
+        #Update positions asteroids, bullets
+        self.move_objects()
+
+        Done = self.use_fuel(bullet_shot)
+
+        self.detect_collisions()
+
+        if not self.replenish_asteroids():
+            self.events.emit(GameOver(self.frame_count, 'asteroids', 
+                                    self.game_state['score']))
+            return True #end game if no asteroids
+        if Done:
+            self.events.emit(GameOver(self.frame_count, 'fuel', 
+                                    self.game_state['score']))
+        return Done
+
+    def move_spaceship(self, thrust, left, right):
+        if left:
+            self.game_state['spaceship'].turn_left()
+        if right:
+            self.game_state['spaceship'].turn_right()
+        if thrust:
+            self.game_state['spaceship'].move_forward()
+
+    def shoot_bullet(self):
+        '''fires a bullet from the spaceship if there is enough fuel; returns
+        True if bullet was shot'''
+        if self.game_state['fuel'] < config.shoot_fuel_threshold: #not enough fuel
+            self.events.emit(ShotRefused(self.frame_count, self.game_state['fuel']))
+            return False
+
+        #bullet succesfully shot
+        #inherit spaceship position
+        new_bullet_x, new_bullet_y = self.game_state['spaceship'].get_xy()
+        new_bullet_angle = self.game_state['spaceship'].angle
+
+        self.bullet_id_counter += 1
+        new_bullet = SpaceObject(
+            new_bullet_x, new_bullet_y, self.game_state['width'], 
+            self.game_state['height'], new_bullet_angle, 'bullet', 
+            self.bullet_id_counter)
+
+        self.add_bullet(new_bullet) #add bullet to list
+        return True
+
+    def move_objects(self):
+        '''moves asteroids and bullets, removing bullets which have expired'''
+        for asteroid in self.asteroids:
+            asteroid.move_forward()
+
+        self.remove_bullets([bullet for bullet in self.bullets 
+                            if bullet.move_count >= config.bullet_move_count])
+        for bullet in self.bullets:
+            bullet.move_forward()
+
+    def use_fuel(self, bullet_shot):
+        '''deducts fuel used this frame and emits fuel warnings; returns True
+        when fuel has run out'''
+        #use variable rather than player input as attempt to shoot can fail
+        if bullet_shot:
+            self.game_state['fuel'] -= config.bullet_fuel_consumption
+        self.game_state['fuel'] -= config.spaceship_fuel_consumption
+
+        #Fuel warning
+        percent_fuel = self.game_state['fuel']/self.max_fuel * 100
+        
+        if self.fuel_warning_count < len(config.fuel_warning_threshold):
+            current_fuel_warn_thresh = config.fuel_warning_threshold[self.fuel_warning_count]
+            if percent_fuel <= current_fuel_warn_thresh:
+                self.events.emit(FuelWarning(self.frame_count, current_fuel_warn_thresh,
+                                            self.game_state['fuel']))
+                self.fuel_warning_count += 1
+
+        elif self.game_state['fuel'] <= 0:
+            return True
+        return False
+
+    def detect_collisions(self):
+        '''handles bullet v asteroid and asteroid v spaceship collisions'''
+        asteroid_ls = self.asteroid_ls #id order
+        bullet_ls = self.bullet_ls
+
+        #Detect collisions bullet v asteroid
+        #broad phase: hash asteroids by position so each bullet and the
+        #spaceship only test asteroids in neighbouring cells
+        asteroid_hash = SpatialHash(self.game_state['width'],
+                                    self.game_state['height'])
+        for i, asteroid in enumerate(asteroid_ls):
+            asteroid_hash.insert(i, asteroid.x, asteroid.y)
+
+        #bullets hitting each asteroid, keyed by index in asteroid_ls
+        candidate_hits = {}
+        for j, bullet in enumerate(bullet_ls):
+            for i in asteroid_hash.query(bullet.x, bullet.y):
+                if bullet.collide_with(asteroid_ls[i]):
+                    candidate_hits.setdefault(i, []).append(j)
+
+        #asteroid_ls order as main loop as low asteroid id takes priority,
+        #each asteroid is shot by the first unused bullet that hits it
+        shot_asteroids = set()
+        used_bullets = set()
+        for i in sorted(candidate_hits):
+            for j in candidate_hits[i]:
+                if j in used_bullets:
+                    continue
+                asteroid = asteroid_ls[i]
+                bullet = bullet_ls[j]
+                if asteroid.obj_type == 'asteroid_small':
+                    self.game_state['score'] += config.shoot_small_ast_score
+                else:
+                    self.game_state['score'] += config.shoot_large_ast_score
+                self.events.emit(Hit(self.frame_count, bullet.id, asteroid.id,
+                                    self.game_state['score']))
+                shot_asteroids.add(i)
+                used_bullets.add(j)
+                self.hit_count += 1
+                break
+
+        #asteroid v spaceship
+        spaceship = self.game_state['spaceship']
+        for i in asteroid_hash.query(spaceship.x, spaceship.y):
+            if i in shot_asteroids:
+                continue
+            asteroid = asteroid_ls[i]
+            if asteroid.collide_with(spaceship):
+                self.game_state['score'] += config.collide_score
+                self.events.emit(Collision(self.frame_count, asteroid.id,
+                                        self.game_state['score']))
+                shot_asteroids.add(i)
+                self.collision_count += 1
+
+        self.remove_asteroids([asteroid_ls[i] for i in shot_asteroids])
+        self.remove_bullets([bullet_ls[j] for j in used_bullets])
+
+    def replenish_asteroids(self):
+        '''tops asteroids back up to asteroids_count from upcoming asteroids;
+        returns False if there were not enough asteroids available'''
+        while len(self.asteroids) < self.game_state['asteroids_count']:
+            if len(self.upcoming_asteroid_ls) == 0: #check if any asteroids available
+                self.game_state['asteroids_count'] = len(self.asteroids)
+                return False
+            asteroid = self.upcoming_asteroid_ls.pop(0)
+            self.add_asteroid(asteroid)
+            self.events.emit(Spawn(self.frame_count, asteroid.id))
+            self.game_state['upcoming_asteroids_count'] -= 1
+        return True
+
+    #bullets_count is kept in sync by the bullets EntityRegistry
+    def add_asteroid(self, asteroid):
+        self.asteroids.add(asteroid)
+
+    def add_bullet(self, bullet):
+        self.bullets.add(bullet)
+
+    def remove_asteroids(self, asteroids):
+        for asteroid in asteroids:
+            self.asteroids.remove(asteroid)
+
+    def remove_bullets(self, bullets):
+        for bullet in bullets:
+            self.bullets.remove(bullet)
+
     def get_key_value(self, key_ls, file, line_num):
         '''reads line in file and returns key_value pair as tuple'''
         key_value = file.readline().strip().split(' ')
@@ -0,0 +1,143 @@
+"""
+Gym-style environment for training agents without subclassing a player.
+
+    env = GameEnv('examples/game_state_good.txt')
+    observation = env.reset()              # or env.reset(seed=3)
+    while True:
+        observation, reward, done = env.step((thrust, left, right, bullet))
+        if done:
+            break
+
+step also accepts an action number 0-15, the bits thrust|left|right|bullet
+as in replay.py. reward is the change in score. A seed generates a new state
+with scenario_generator.generate_state and scenario keyword arguments.
+
+The observation is one float32 array of shape (1 + max_asteroids +
+max_bullets, len(features)), allocated once and overwritten in place by
+every reset and step, so copy it to keep it. Row 0 is the spaceship, then
+asteroids and bullets in id order; unused rows are zero. Positions are
+fractions of the screen size, and extra is the fraction of fuel left for
+the spaceship, radius over the largest radius for asteroids and fraction of
+frames left for bullets. Objects beyond max_asteroids or max_bullets are
+left out.
+"""
+
+import os
+import sys
+import tempfile
+import config
+from game_engine import Engine
+from events import EventBus
+from trig_table import unit_vector
+from replay import unpack_input
+from scenario_generator import generate_state
+
+try:
+    import numpy as np
+except ImportError:
+    print("Error: 'numpy' module is not installed.")
+    sys.exit(1)
+
+features = ('present', 'x', 'y', 'cos', 'sin', 'extra')
+radius_fraction = {obj_type: radius / max(config.radius.values())
+                for obj_type, radius in config.radius.items()}
+
+
+class GameEnv:
+    def __init__(self, state_file=None, seed=None, max_asteroids=64,
+                max_bullets=16, engine_class=Engine, quiet=True, **scenario):
+        self.state_file = state_file
+        self.seed = seed
+        self.scenario = scenario #generate_state arguments for seeded resets
+        self.engine_class = engine_class
+        self.engine = None
+        self.done = True
+        self.score = 0
+
+        self.observation = np.zeros((1 + max_asteroids + max_bullets, len(features)),
+                                    dtype=np.float32)
+        self.asteroid_rows = self.observation[1:1 + max_asteroids]
+        self.bullet_rows = self.observation[1 + max_asteroids:]
+        self.rows_used = {'asteroids': 0, 'bullets': 0} #rows to clear next time
+
+        #quiet discards engine events rather than printing them
+        self.quiet = quiet
+        self.directory = None #for generated state files
+
+    def reset(self, state_file=None, seed=None):
+        '''starts a new game from state_file, or a state generated from seed
+        (the last used if neither is given); returns the observation'''
+        if state_file is not None or seed is not None:
+            self.state_file = state_file
+            self.seed = seed
+        if self.seed is not None:
+            if self.directory is None:
+                self.directory = tempfile.TemporaryDirectory()
+            filename = os.path.join(self.directory.name, f'seed_{self.seed}.txt')
+            generate_state(filename, self.seed, **self.scenario)
+        elif self.state_file is not None:
+            filename = self.state_file
+        else:
+            raise ValueError('Error: reset needs a state file or seed')
+
+        #the engine's player is never asked for an action, step drives update
+        self.engine = self.engine_class(filename, lambda: None, headless=True,
+                                        events=EventBus() if self.quiet else None)
+        self.done = False
+        self.score = self.engine.game_state['score']
+        return self.observe()
+
+    def step(self, action):
+        '''plays one frame given (thrust, left, right, bullet) or an action
+        number; returns (observation, reward, done)'''
+        if self.done:
+            raise ValueError('Error: game is over, call reset')
+        if isinstance(action, (int, np.integer)):
+            action = unpack_input(action)
+        self.done = self.engine.update(action)
+        score = self.engine.game_state['score']
+        reward = score - self.score
+        self.score = score
+        return self.observe(), reward, self.done
+
+    def observe(self):
+        '''writes the current game state into the observation buffer'''
+        game_state = self.engine.game_state
+        width = game_state['width']
+        height = game_state['height']
+
+        spaceship = game_state['spaceship']
+        cos_a, sin_a = unit_vector(spaceship.angle)
+        self.observation[0] = (1, spaceship.x / width, spaceship.y / height,
+                            cos_a, sin_a, game_state['fuel'] / self.engine.max_fuel)
+
+        rows = self.asteroid_rows
+        n = 0
+        for asteroid in self.engine.asteroids:
+            if n == len(rows):
+                break
+            cos_a, sin_a = unit_vector(asteroid.angle)
+            rows[n] = (1, asteroid.x / width, asteroid.y / height, cos_a, sin_a,
+                    radius_fraction[asteroid.obj_type])
+            n += 1
+        rows[n:self.rows_used['asteroids']] = 0
+        self.rows_used['asteroids'] = n
+
+        rows = self.bullet_rows
+        n = 0
+        for bullet in self.engine.bullets:
+            if n == len(rows):
+                break
+            cos_a, sin_a = unit_vector(bullet.angle)
+            rows[n] = (1, bullet.x / width, bullet.y / height, cos_a, sin_a,
+                    1 - bullet.move_count / config.bullet_move_count)
+            n += 1
+        rows[n:self.rows_used['bullets']] = 0
+        self.rows_used['bullets'] = n
+
+        return self.observation
+
+    def close(self):
+        if self.directory is not None:
+            self.directory.cleanup()
+            self.directory = None
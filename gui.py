@@ -17,37 +17,99 @@ class GUI:
         self.width = width
         self.height = height
 
-        pygame.init()
-
-        self.screen = pygame.display.set_mode([self.width, self.height])
-        pygame.display.set_caption(config.game_name)
+        self.screen = self.create_screen()
 
         self.font = pygame.font.Font('resources/fonts/PressStart2P-vaV7.ttf', 20)
-        self.bg_image = pygame.image.load('resources/img/background.jpeg').convert()
+        self.bg_image = self.load_image('resources/img/background.jpeg', alpha=False)
         self.bg_image = pygame.transform.scale(self.bg_image, (self.width, self.height))
-        self.ship_icon = pygame.image.load('resources/img/spaceship.png').convert_alpha()
-        self.ast_sm_icon = pygame.image.load('resources/img/asteroid-small.png').convert_alpha()
-        self.ast_lg_icon = pygame.image.load('resources/img/asteroid-large.png').convert_alpha()
+        self.ship_icon = self.load_image('resources/img/spaceship.png')
+        self.ast_sm_icon = self.load_image('resources/img/asteroid-small.png')
+        self.ast_lg_icon = self.load_image('resources/img/asteroid-large.png')
+
+        #ship pre-rotated to every heading it can face
+        self.ship_sprites = {angle: self.rot_center(self.ship_icon, angle)
+                            for angle in range(0, 360, config.angle_increment)}
+        #rendered HUD text, re-rendered only when its value changes
+        self.hud_text = {}
+        #rects drawn last frame, erased and updated next frame
+        self.dirty_rects = []
 
         self.set_background("-", "-")
-        pygame.display.update()
+        self.present()
 
-    def set_background(self, score, fuel):
+    def create_screen(self):
+        '''returns the surface frames are drawn on'''
+        pygame.init()
+        screen = pygame.display.set_mode([self.width, self.height])
+        pygame.display.set_caption(config.game_name)
+        return screen
+
+    def load_image(self, filename, alpha=True):
+        '''returns image converted to the screen's pixel format'''
+        image = pygame.image.load(filename)
+        return image.convert_alpha() if alpha else image.convert()
+
+    def present(self, rects=None):
+        '''shows rects of the screen (all of it if None) on the display'''
+        if rects is None:
+            pygame.display.update()
+        else:
+            pygame.display.update(rects)
+
+    def poll_events(self):
+        '''handles pending window events; returns True if the window was
+        closed. Must be called on the main thread'''
+        closed = False
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
-                print("Error: User closed the window")
-                sys.exit(1)
-        self.screen.blit(self.bg_image, [0, 0])
+                closed = True
+        return closed
 
-        score_text = self.font.render("Score {}".format(score), True, green, blue)
-        score_text_rect = score_text.get_rect()
-        score_text_rect.topleft = (15, 15)
-        self.screen.blit(score_text, score_text_rect)
+    def handle_events(self):
+        if self.poll_events():
+            self.window_closed()
 
-        fuel_text = self.font.render("Fuel {}".format(fuel), True, green, blue)
-        fuel_text_rect = fuel_text.get_rect()
-        fuel_text_rect.topleft = (15, 35)
-        self.screen.blit(fuel_text, fuel_text_rect)
+    def window_closed(self):
+        print("Error: User closed the window")
+        sys.exit(1)
+
+    def set_background(self, score, fuel):
+        self.handle_events()
+        self.screen.blit(self.bg_image, [0, 0])
+        self.draw_hud(score, fuel)
+
+    def render_hud_text(self, label, value, topleft):
+        '''returns (surface, rect) of HUD text, cached while value is unchanged'''
+        cached = self.hud_text.get(label)
+        if cached is None or cached[0] != value:
+            text = self.font.render("{} {}".format(label, value), True, green, blue)
+            text_rect = text.get_rect()
+            text_rect.topleft = topleft
+            cached = (value, text, text_rect)
+            self.hud_text[label] = cached
+        return cached[1], cached[2]
+
+    def draw_hud(self, score, fuel):
+        '''draws score and fuel; returns rects which changed since last drawn'''
+        changed = []
+        for label, value, topleft in (("Score", score, (15, 15)), 
+                                    ("Fuel", fuel, (15, 35))):
+            old = self.hud_text.get(label)
+            text, text_rect = self.render_hud_text(label, value, topleft)
+            if old is None or old[0] != value:
+                if old is not None: #erase longer old text
+                    self.screen.blit(self.bg_image, old[2], old[2])
+                    changed.append(old[2])
+                changed.append(text_rect)
+            self.screen.blit(text, text_rect)
+        return changed
+
+    def ship_sprite(self, angle):
+        sprite = self.ship_sprites.get(angle)
+        if sprite is None: #heading not a multiple of angle_increment
+            sprite = self.rot_center(self.ship_icon, angle)
+            self.ship_sprites[angle] = sprite
+        return sprite
 
 
     def rot_center(self, image, angle):
@@ -64,30 +126,46 @@ class GUI:
 
 
     def update_frame(self, spaceship, asteroid_ls, bullet_ls, score, fuel):
-        self.set_background(score, fuel)
+        self.handle_events()
+        self.draw_frame(spaceship, asteroid_ls, bullet_ls, score, fuel)
+
+    def draw_frame(self, spaceship, asteroid_ls, bullet_ls, score, fuel):
+        '''draws and shows a frame without handling events, so it can run on
+        a render thread'''
+        #erase last frame's objects by redrawing the background under them
+        self.screen.blits([(self.bg_image, rect, rect) for rect in self.dirty_rects])
+        drawn_rects = self.draw_hud(score, fuel)
 
         # Display Player
-        spaceship_image = self.rot_center(self.ship_icon, spaceship.angle)
         spaceship_pos = offset(spaceship.get_xy(), -spaceship.radius)
-        self.screen.blit(spaceship_image, spaceship_pos)
+        drawn_rects.append(self.screen.blit(self.ship_sprite(spaceship.angle), 
+                                            spaceship_pos))
 
         # Display Asteroid
-        for asteroid in asteroid_ls:
-            ast_pos = offset(asteroid.get_xy(), -asteroid.radius)
-
-            if asteroid.obj_type == "asteroid_small":
-                self.screen.blit(self.ast_sm_icon, ast_pos)
-            elif asteroid.obj_type == "asteroid_large":
-                self.screen.blit(self.ast_lg_icon, ast_pos)
+        icons = {"asteroid_small": self.ast_sm_icon, 
+                "asteroid_large": self.ast_lg_icon}
+        drawn_rects.extend(self.screen.blits(
+            [(icons[asteroid.obj_type], offset(asteroid.get_xy(), -asteroid.radius))
+            for asteroid in asteroid_ls if asteroid.obj_type in icons]))
 
         # Display Bullet
         for bullet in bullet_ls:
-            pygame.draw.circle(self.screen, gold, bullet.get_xy(), bullet.radius)
+            drawn_rects.append(pygame.draw.circle(self.screen, gold, 
+                                                bullet.get_xy(), bullet.radius))
 
-        pygame.display.update()
-        pygame.time.wait(int(config.frame_delay * 1000))
+        #only the areas erased or drawn this frame are sent to the display
+        self.present(self.dirty_rects + drawn_rects)
+        self.dirty_rects = drawn_rects
+        #frame pacing is done by Engine, see frame_scheduler.py
 
     def finish(self, score):
+        self.draw_final_score(score)
+        self.present()
+
+        pygame.time.wait(3000)
+        pygame.quit()
+
+    def draw_final_score(self, score):
         self.set_background(score, 0)
 
         score_text = self.font.render("Final Score {}".format(score), True, green, blue)
@@ -95,8 +173,3 @@ class GUI:
         score_text_rect.center = (self.width // 2, self.height // 2)
         self.screen.blit(score_text, score_text_rect)
 
-        pygame.display.update()
-
-        pygame.time.wait(3000)
-        pygame.quit()
-
@@ -0,0 +1,14 @@
+class NullGUI:
+    '''Renderer with the same interface as GUI that draws nothing and never
+    waits between frames. Used by Engine in headless mode so that pygame is
+    never imported'''
+
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+
+    def update_frame(self, spaceship, asteroid_ls, bullet_ls, score, fuel):
+        pass
+
+    def finish(self, score):
+        pass
@@ -0,0 +1,262 @@
+"""
+Offscreen rendering to image files or video, for machines without a display.
+
+OffscreenGUI draws with GUI's code on a plain Surface instead of a window and
+hands each frame to a background thread which writes it out, so the game
+never waits for encoding. When the thread falls behind and queue_size frames
+are waiting, new frames are dropped and counted in dropped.
+
+    gui_class = functools.partial(OffscreenGUI, output='frames')
+    game = Engine('examples/game_state_good.txt', Player, gui_class,
+                scheduler=FixedTimestep(frame_delay=0))
+
+FixedTimestep(frame_delay=0) runs unpaced and renders every frame. output is
+a directory for a PNG sequence (frame_000000.png, ...), a .raw file of RGB
+frames back to back, or a video file (.mp4, .mkv, .webm, .avi, .mov, .gif)
+piped to ffmpeg. Without ffmpeg on the PATH a video is written as a PNG
+sequence in a directory named after it instead. From the command line:
+
+    python3 offscreen_gui.py examples/game_state_good.txt replay.mp4
+    python3 offscreen_gui.py --replay recordings/run1 frames
+"""
+
+import os
+import sys
+import zlib
+import queue
+import struct
+import shutil
+import argparse
+import threading
+import subprocess
+import config
+from gui import GUI
+
+try:
+    import pygame
+except ImportError:
+    print("Error: 'pygame' module is not installed.")
+    sys.exit(1)
+
+video_extensions = ('.mp4', '.mkv', '.webm', '.avi', '.mov', '.gif')
+#pygame.image.tobytes was added in pygame 2.1.3, tostring is its older name
+image_bytes = getattr(pygame.image, 'tobytes', None) or pygame.image.tostring
+
+
+def png_chunk(kind, data):
+    return (struct.pack('>I', len(data)) + kind + data +
+            struct.pack('>I', zlib.crc32(kind + data)))
+
+
+def png_bytes(surface, compression=1):
+    '''returns surface encoded as an RGB PNG. pygame.image.save holds the GIL
+    while it compresses, stalling the game; zlib releases it'''
+    width, height = surface.get_size()
+    pixels = image_bytes(surface, 'RGB')
+    stride = width * 3
+    #every row starts with its filter type, 0 for none
+    rows = b''.join(b'\x00' + pixels[y * stride:(y + 1) * stride]
+                    for y in range(height))
+    return (b'\x89PNG\r\n\x1a\n' +
+            png_chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0)) +
+            png_chunk(b'IDAT', zlib.compress(rows, compression)) +
+            png_chunk(b'IEND', b''))
+
+
+class PngWriter:
+    '''Saves frames as numbered PNG files in directory, numbered by frame so
+    dropped frames leave gaps. compression is the zlib level, 1 (fastest) to
+    9 (smallest)'''
+
+    def __init__(self, directory, compression=1):
+        self.directory = directory
+        self.compression = compression
+        os.makedirs(directory, exist_ok=True)
+
+    def write(self, index, surface):
+        filename = os.path.join(self.directory, f'frame_{index:06}.png')
+        with open(filename, 'wb') as f:
+            f.write(png_bytes(surface, self.compression))
+
+    def close(self):
+        pass
+
+
+class RawWriter:
+    '''Writes frames to one file as RGB bytes, a row of pixels at a time'''
+
+    def __init__(self, filename):
+        self.file = open(filename, 'wb')
+
+    def write(self, index, surface):
+        self.file.write(image_bytes(surface, 'RGB'))
+
+    def close(self):
+        self.file.close()
+
+
+class EncoderWriter:
+    '''Pipes RGB frames to ffmpeg, which encodes them to filename. ffmpeg is
+    started on the first frame, once the frame size is known'''
+
+    def __init__(self, filename, fps=None, encoder=None):
+        self.filename = filename
+        self.fps = 1 / config.frame_delay if fps is None else fps
+        self.encoder = shutil.which('ffmpeg') if encoder is None else encoder
+        if self.encoder is None:
+            raise ValueError('Error: ffmpeg not found')
+        self.process = None
+
+    def write(self, index, surface):
+        if self.process is None:
+            width, height = surface.get_size()
+            command = [self.encoder, '-loglevel', 'error', '-y',
+                    '-f', 'rawvideo', '-pix_fmt', 'rgb24',
+                    '-s', f'{width}x{height}', '-r', f'{self.fps:g}',
+                    '-i', '-', self.filename]
+            self.process = subprocess.Popen(command, stdin=subprocess.PIPE)
+        self.process.stdin.write(image_bytes(surface, 'RGB'))
+
+    def close(self):
+        if self.process is not None:
+            self.process.stdin.close()
+            if self.process.wait() != 0:
+                raise ValueError(f'Error: ffmpeg failed to write {self.filename}')
+
+
+def open_writer(output, fps=None):
+    '''returns writer for output, chosen by its extension'''
+    root, extension = os.path.splitext(output)
+    extension = extension.lower()
+    if extension in ('.raw', '.rgb'):
+        return RawWriter(output)
+    if extension in video_extensions:
+        if shutil.which('ffmpeg') is not None:
+            return EncoderWriter(output, fps)
+        print(f"ffmpeg not found, writing {output} as PNG frames in {root}")
+        return PngWriter(root)
+    return PngWriter(output)
+
+
+class FrameEncoder:
+    '''Writes frames with writer on a background thread. A frame submitted
+    while queue_size frames are waiting is dropped and counted'''
+
+    def __init__(self, writer, queue_size=64):
+        self.writer = writer
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.frames = 0 #submitted, including dropped
+        self.dropped = 0
+        self.error = None #first exception raised by writer
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def submit(self, surface, block=False):
+        '''queues a copy of surface; returns False if it was dropped'''
+        index = self.frames
+        self.frames += 1
+        #only this thread adds frames, so the queue cannot fill up between
+        #checking and adding
+        if self.error is not None or (not block and self.queue.full()):
+            self.dropped += 1
+            return False
+        self.queue.put((index, surface.copy()))
+        return True
+
+    def run(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                return
+            if self.error is None: #after an error, frames are only drained
+                try:
+                    self.writer.write(*item)
+                except Exception as e:
+                    self.error = e
+
+    def close(self):
+        '''writes queued frames and closes writer'''
+        if self.thread is None:
+            return
+        self.queue.put(None)
+        self.thread.join()
+        self.thread = None
+        self.writer.close()
+        if self.error is not None:
+            raise self.error
+
+
+class OffscreenGUI(GUI):
+    def __init__(self, width, height, output='frames', queue_size=64, fps=None):
+        super().__init__(width, height)
+        #output is a filename or directory, or a writer object
+        writer = open_writer(output, fps) if isinstance(output, str) else output
+        self.encoder = FrameEncoder(writer, queue_size)
+
+    def create_screen(self):
+        pygame.font.init()
+        return pygame.Surface((self.width, self.height))
+
+    def load_image(self, filename, alpha=True):
+        #converting needs a display, images are drawn in their own format
+        return pygame.image.load(filename)
+
+    def present(self, rects=None):
+        pass
+
+    def poll_events(self):
+        return False
+
+    @property
+    def dropped(self):
+        return self.encoder.dropped
+
+    def draw_frame(self, spaceship, asteroid_ls, bullet_ls, score, fuel):
+        super().draw_frame(spaceship, asteroid_ls, bullet_ls, score, fuel)
+        self.encoder.submit(self.screen)
+
+    def finish(self, score):
+        #the final score frame is always written
+        self.draw_final_score(score)
+        self.encoder.submit(self.screen, block=True)
+        self.encoder.close()
+
+
+def main():
+    from game_engine import Engine
+    from events import EventBus
+    from replay import Replay
+    from frame_scheduler import FixedTimestep
+    from batch_runner import load_class
+
+    parser = argparse.ArgumentParser(description='Render a game or recording to files.')
+    parser.add_argument('source', nargs='?',
+                        help='game state file to play (not needed with --replay)')
+    parser.add_argument('output', help='PNG directory, .raw file or video file')
+    parser.add_argument('--replay', metavar='DIRECTORY',
+                        help='render a replay.Recorder recording instead')
+    parser.add_argument('--player', default='player:Player',
+                        help='player class as module:Class')
+    parser.add_argument('--queue-size', type=int, default=64)
+    parser.add_argument('--fps', type=float, help='video frame rate')
+    args = parser.parse_args()
+    if (args.source is None) == (args.replay is None):
+        parser.error('give a game state file or --replay, not both')
+
+    def gui_class(width, height):
+        return OffscreenGUI(width, height, args.output, args.queue_size, args.fps)
+
+    if args.replay is not None:
+        game = Replay(args.replay).seek(0)
+        game.GUI = gui_class(game.game_state['width'], game.game_state['height'])
+        game.events = EventBus()
+    else:
+        game = Engine(args.source, load_class(args.player), gui_class,
+                    scheduler=FixedTimestep(frame_delay=0), events=EventBus())
+    game.run_game()
+    print(f'Score {game.game_state["score"]}: rendered {game.GUI.encoder.frames} '
+        f'frames, dropped {game.GUI.dropped}')
+
+
+if __name__ == '__main__':
+    main()
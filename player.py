@@ -1,5 +1,29 @@
 import math
 import config
+from trig_table import unit_vector
+from spatial_hash import SpatialHash
+from frame_table import FrameTable
+
+try: #numpy is optional, shoot falls back to looping over options without it
+    import numpy as np
+except ImportError:
+    np = None
+
+#(turn, spaceship_move) shooting options in the order shoot reports them
+shoot_moves = [(turn, spaceship_move) for turn in (0,-1,1) 
+            for spaceship_move in (True,False)]
+
+def plan_drift_bound():
+    '''returns the most frames an asteroid's cost changes by in one frame
+    under the current config. Measured on generated states the change grows
+    with the asteroids' speed relative to the spaceship's and with
+    angle_increment; this is at least one frame above the largest change
+    measured for asteroid speeds 0 to 12, spaceship speeds 6 to 16 and
+    angle_increment 10 to 30'''
+    asteroid_speed = max(config.speed['asteroid_small'], 
+                        config.speed['asteroid_large'])
+    return (3 + math.ceil(config.angle_increment / 15) + 
+            math.ceil(6 * asteroid_speed / config.speed['spaceship']))
 
 class Player:
     
@@ -11,27 +35,79 @@ class Player:
         #bullet range in terms of frames it take the spaceship to travel distance
         self.shoot_range = (config.bullet_move_count * config.speed['bullet'] //
                             config.speed['spaceship'])
+        #thrust towards the target while further than thrust_cutoff turning
+        #radii from it
+        self.thrust_cutoff = 3
+        #weights of a shooting option's score: not matching the best thrust
+        #for the next target, and turning away from it. At 0 the options are
+        #only ranked by thrust, preferring it
+        self.option_move_weight = 0
+        self.option_turn_weight = 0
+        #predicted paths are memoized for the duration of one action call,
+        #keyed by (id, obj_type, x, y, angle, frames)
+        self.path_cache = None
+        #path cache counters, totals over all frames
+        self.path_cache_hits = 0
+        self.path_cache_misses = 0
+        #number of asteroids nearest the spaceship considered as targets each
+        #frame, None considers every asteroid
+        self.target_count = 32
+        #plan kept across frames: asteroid id -> (frame calculated, cost,
+        #dst, angle, turns). A cost changes by at most plan_drift frames per
+        #frame as the spaceship and asteroid move, so an entry bounds the
+        #current cost and is only recalculated when the asteroid could be
+        #the best target, or after replan_interval frames. Entries are
+        #dropped when the asteroid is no longer a target. The plan is only
+        #used during action. plan_drift None uses plan_drift_bound() for
+        #the config at the time
+        self.plan = None
+        self.plans = {}
+        self.replan_interval = 8
+        self.plan_drift = None
+        self.frame = 0
+        #plan counters, totals over all frames
+        self.plan_hits = 0
+        self.plan_misses = 0
+        #tabulated frame_estimate values, see frame_table.py; set to None
+        #to always calculate them
+        self.frame_table = FrameTable.load(self.relative_frame_estimate,
+                                        self.turning_radius)
 
     def action(self, spaceship, asteroid_ls, bullet_ls, fuel, score):
         #store screen width/height as Player instance attributes
         self.width = spaceship.width
         self.height = spaceship.height
-
-        #sort asteroid list by distance from spaceship
+        self.path_cache = {} #new frame, objects have moved
+
+        #targets are the asteroids nearest the spaceship, found with a spatial
+        #index over the wraparound screen rather than sorting every asteroid
+        if self.target_count is not None and self.target_count < len(asteroid_ls):
+            index = SpatialHash(self.width, self.height)
+            for i, asteroid in enumerate(asteroid_ls):
+                index.insert(i, asteroid.x, asteroid.y)
+            asteroid_ls = [asteroid_ls[i] for i in index.nearest(spaceship.x, 
+                                                                spaceship.y,
+                                                                self.target_count)]
+
+        #sort targets by distance from spaceship
         sort_key = lambda x:(self.wraparound_dist_angle(spaceship.get_xy(), 
                                                         x.get_xy()))
-        asteroid_ls.sort(key=sort_key)
-
         #copy of asteroid_ls, which we can modify
-        asteroid_ls2 = asteroid_ls.copy()
+        asteroid_ls2 = sorted(asteroid_ls, key=sort_key)
+
+        #new frame, drop plan entries for asteroids which are no longer targets
+        self.frame += 1
+        self.plan = self.plans
+        for id in self.plan.keys() - {asteroid.id for asteroid in asteroid_ls}:
+            del self.plan[id]
 
         #detects which asteroids will be destroyed by already fired bullets
         #we can ignore these asteroids
         for projectile in bullet_ls:
             bullet_used = False
+            #use bullet_move_count + 1 as bullet travels immediately when fired
+            bullet_path = self.get_path(projectile, config.bullet_move_count +1)
             for asteroid in asteroid_ls2:
-                #use bullet_move_count + 1 as bullet travels immediately when fired
-                bullet_path = self.get_path(projectile, config.bullet_move_count +1)
                 asteroid_path = self.get_path(asteroid, config.bullet_move_count +1)
                 for i in range(1, config.bullet_move_count + 1):
                     if self.collide_with('bullet', bullet_path[i], 
@@ -59,16 +135,17 @@ class Player:
                 if options:
                     option_score_ls = []
                     for move, offset, asteroid in options:
-                        asteroid_ls3 = asteroid_ls2.copy()
-                        asteroid_ls3.remove(asteroid)
-                        best_move, best_turn = self.move(asteroid_ls3, spaceship)
-                        if move == best_move:
-                            option_score = 0
-                        else:
-                            option_score = 1
-                        option_score += abs(offset - best_turn)
-
-                        option_score_ls.append((score, move, offset))
+                        option_score = 0
+                        if self.option_move_weight or self.option_turn_weight:
+                            asteroid_ls3 = asteroid_ls2.copy()
+                            asteroid_ls3.remove(asteroid)
+                            best_move, best_turn = self.move(asteroid_ls3, spaceship)
+                            if move != best_move:
+                                option_score += self.option_move_weight
+                            option_score += (self.option_turn_weight * 
+                                            abs(offset - best_turn))
+
+                        option_score_ls.append((option_score, move, offset))
                     thrust, turn = min(option_score_ls, key=lambda x:(x[0], -x[1]))[1:3]
                     bullet = True
 
@@ -96,6 +173,8 @@ class Player:
                 left = True
                 right = False
 
+        self.path_cache = None #discard paths once frame's action is decided
+        self.plan = None
 
         return (thrust, left, right, bullet)
 
@@ -103,12 +182,24 @@ class Player:
         '''returns list of coords of an asteroid's path over a number of frames'''
         x0, y0 = asteroid.get_xy()
         obj_type, angle = asteroid.obj_type, asteroid.angle
+        if self.path_cache is not None:
+            key = (asteroid.id, obj_type, x0, y0, angle, frames)
+            path = self.path_cache.get(key)
+            if path is not None:
+                self.path_cache_hits += 1
+                return path
+            self.path_cache_misses += 1
+
         speed = config.speed[obj_type]
+        cos_a, sin_a = unit_vector(angle)
         path = []
         for frame in range(frames):
-            x = (x0 + frame * speed * math.cos(math.radians(angle))) % self.width
-            y = (y0 - frame * speed * math.sin(math.radians(angle))) % self.height
+            x = (x0 + frame * speed * cos_a) % self.width
+            y = (y0 - frame * speed * sin_a) % self.height
             path.append((x,y))
+
+        if self.path_cache is not None:
+            self.path_cache[key] = path
         return path
 
     def get_bullet_path(self, spaceship, offset, spaceship_move):
@@ -117,13 +208,14 @@ class Player:
         x0, y0 = spaceship.get_xy()
         speed = config.speed['bullet']
         angle = (spaceship.angle + config.angle_increment*offset) % 360
+        cos_a, sin_a = unit_vector(angle)
         if spaceship_move:
-            x0 += config.speed['spaceship'] * math.cos(math.radians(angle))
-            y0 -= config.speed['spaceship'] * math.sin(math.radians(angle))
+            x0 += config.speed['spaceship'] * cos_a
+            y0 -= config.speed['spaceship'] * sin_a
         path = []
         for frame in range(config.bullet_move_count + 1):
-            x = (x0 + frame * speed * math.cos(math.radians(angle))) % self.width
-            y = (y0 - frame * speed * math.sin(math.radians(angle))) % self.height
+            x = (x0 + frame * speed * cos_a) % self.width
+            y = (y0 - frame * speed * sin_a) % self.height
             path.append((x,y))
         return path
 
@@ -132,21 +224,69 @@ class Player:
         '''Returns list of (thrust, turn) actions which would lead to a
         successful hit on an asteroid if bullet is fired. Returns empty list
         when no asteroid in range'''
+        if np is None or len(asteroid_ls) == 0:
+            return self.shoot_loop(spaceship, asteroid_ls)
+
+        frames = config.bullet_move_count + 1
+        #bullet paths for every option, shape (options, frames)
+        bullet_paths = np.array([self.get_bullet_path(spaceship, turn, spaceship_move)
+                                for turn, spaceship_move in shoot_moves])
+        bullet_x = bullet_paths[:, :, 0]
+        bullet_y = bullet_paths[:, :, 1]
+
+        #asteroid paths, shape (asteroids, frames), same arithmetic as get_path
+        #so positions match bit for bit
+        x0 = np.array([asteroid.x for asteroid in asteroid_ls])
+        y0 = np.array([asteroid.y for asteroid in asteroid_ls])
+        speed = np.array([config.speed[asteroid.obj_type] for asteroid in asteroid_ls])
+        cos_a, sin_a = np.array([unit_vector(asteroid.angle) 
+                                for asteroid in asteroid_ls]).T
+        frame_speed = np.arange(frames) * speed[:, None]
+        astr_x = (x0[:, None] + frame_speed * cos_a[:, None]) % self.width
+        astr_y = (y0[:, None] - frame_speed * sin_a[:, None]) % self.height
+
+        #wraparound distance for every option, asteroid and frame after firing,
+        #shape (options, asteroids, frames - 1)
+        x_diff = astr_x[None, :, 1:] - bullet_x[:, None, 1:]
+        y_diff = astr_y[None, :, 1:] - bullet_y[:, None, 1:]
+        x_diff = np.minimum(np.abs(x_diff), np.minimum(np.abs(x_diff + self.width), 
+                                                        np.abs(x_diff - self.width)))
+        y_diff = np.minimum(np.abs(y_diff), np.minimum(np.abs(y_diff + self.height), 
+                                                        np.abs(y_diff - self.height)))
+        dst = np.hypot(x_diff, y_diff)
+        dst_limit = np.array([config.radius['bullet'] + config.radius[asteroid.obj_type]
+                            for asteroid in asteroid_ls])
+
+        #np.hypot may round differently to math.dist, so near misses within a
+        #small margin are confirmed with collide_with
+        hits = dst <= dst_limit[None, :, None] + 1e-6
         options = []
-        for turn in (0,-1,1):
-            for spaceship_move in (True,False):
-                path = self.get_bullet_path(spaceship, turn, spaceship_move)
-                for asteroid in asteroid_ls:
-                    astr_path = self.get_path(asteroid, 
-                                            config.bullet_move_count + 1)
-
-                    for frame in range(1, config.bullet_move_count + 1):
-                        if self.collide_with('bullet', 
-                                            path[frame], 
-                                            asteroid.obj_type, 
-                                            astr_path[frame]):
-
-                            options.append((spaceship_move, turn, asteroid))
+        for option, i, frame in zip(*np.nonzero(hits)): #nonzero is in option order
+            turn, spaceship_move = shoot_moves[option]
+            asteroid = asteroid_ls[i]
+            if self.collide_with('bullet', 
+                                tuple(bullet_paths[option, frame + 1]), 
+                                asteroid.obj_type, 
+                                (astr_x[i, frame + 1], astr_y[i, frame + 1])):
+                options.append((spaceship_move, turn, asteroid))
+        return options
+
+    def shoot_loop(self, spaceship, asteroid_ls):
+        '''same as shoot, checking one option, asteroid and frame at a time'''
+        options = []
+        for turn, spaceship_move in shoot_moves:
+            path = self.get_bullet_path(spaceship, turn, spaceship_move)
+            for asteroid in asteroid_ls:
+                astr_path = self.get_path(asteroid, 
+                                        config.bullet_move_count + 1)
+
+                for frame in range(1, config.bullet_move_count + 1):
+                    if self.collide_with('bullet', 
+                                        path[frame], 
+                                        asteroid.obj_type, 
+                                        astr_path[frame]):
+
+                        options.append((spaceship_move, turn, asteroid))
         return options
 
     def collide_with(self, obj1_type, xy1, obj2_type, xy2):
@@ -216,6 +356,15 @@ class Player:
         '''estimates number of frames spaceship takes travel vector'''
         dist, angle = vector
         angle_to_astr = abs(self.normalized_angle(spaceship.angle, angle))
+        if self.frame_table is not None:
+            estimate = self.frame_table.lookup(dist, angle_to_astr)
+            if estimate is not None:
+                return estimate
+        return self.relative_frame_estimate(dist, angle_to_astr)
+
+    def relative_frame_estimate(self, dist, angle_to_astr):
+        '''frame_estimate for target dist away and angle_to_astr (0 to 180)
+        degrees from the spaceship's heading'''
         '''Number of stationary turns (thrust = False), if thrust is True while
         not facing the asteroid we would be moving away.
         The ceiling divide (angle - 90) / 15 gives us how many turns it takes 
@@ -245,49 +394,80 @@ class Player:
             turns += 1 #see if aditional stationary turns are an improvement
             angle_to_astr -= config.angle_increment
 
+    def asteroid_cost(self, spaceship, asteroid, frames=1):
+        '''returns (cost, dst, angle, turns) of pursuing asteroid: number of
+        frames to reach it, vector to it and number of stationary turns'''
+        radius_speed = config.radius[asteroid.obj_type] // config.speed['spaceship']
+        moves = max(1, int(frames))
+        astr_xy = self.get_path(asteroid, moves)[moves -1]
+
+        trajectory, turns, frames = self.adj_d_angle(spaceship, 
+                                                    spaceship.get_xy(), 
+                                                    spaceship.angle, 
+                                                    astr_xy)
+        dst, angle = trajectory
+        #get moves it takes to reach shooting distance
+        moves = max(1, int(frames - self.shoot_range - radius_speed))
+        astr_xy = self.get_path(asteroid, moves)[moves -1]
+
+        #recalculate trajectory based on new asteroid position
+        trajectory, turns, frames = self.adj_d_angle(spaceship, 
+                                                    spaceship.get_xy(), 
+                                                    spaceship.angle, 
+                                                    astr_xy)
+        dst, angle = trajectory
+        #repeating and recalculating move and predicted asteroid position
+        #should approach optimal solution, but for speed we only do it once
+        #this does assume spaceship is faster than asteroids
+        return frames, dst, angle, turns
+
+    def planned_cost(self, spaceship, asteroid, max_age=0):
+        '''returns plan entry (frame, cost, dst, angle, turns) for asteroid,
+        recalculating it if it is more than max_age frames old'''
+        entry = self.plan.get(asteroid.id)
+        if entry is None or self.frame - entry[0] > max_age:
+            self.plan_misses += 1
+            entry = (self.frame,) + self.asteroid_cost(spaceship, asteroid)
+            self.plan[asteroid.id] = entry
+        return entry
+
     def cost_estimate(self, spaceship, asteroid_ls, frames=1):
         '''finds best target in terrms of number of frames to reach target;
         returns vector to target, number of stationary turns, and cost'''
-        #variables to store best path
-        best_dst = None
-        best_angle = None
-        best_turns = None
-        least_cost = None
-        for asteroid in asteroid_ls:
-            radius_speed = config.radius[asteroid.obj_type] // config.speed['spaceship']
-            moves = max(1, int(frames))
-            astr_xy = self.get_path(asteroid, moves)[moves -1]
-
-            trajectory, turns, frames = self.adj_d_angle(spaceship, 
-                                                        spaceship.get_xy(), 
-                                                        spaceship.angle, 
-                                                        astr_xy)
-            dst, angle = trajectory
-            #get moves it takes to reach shooting distance
-            moves = max(1, int(frames - self.shoot_range - radius_speed))
-            astr_xy = self.get_path(asteroid, moves)[moves -1]
-
-            #recalculate trajectory based on new asteroid position
-            trajectory, turns, frames = self.adj_d_angle(spaceship, 
-                                                        spaceship.get_xy(), 
-                                                        spaceship.angle, 
-                                                        astr_xy)
-            dst, angle = trajectory
-            #get moves it takes to reach shooting distance to predicted asteroid pos
-            moves = max(1, int(frames - self.shoot_range - radius_speed))
-            #repeating and recalculating move and predicted asteroid position
-            #should approach optimal solution, but for speed we only do it once
-            #this does assume spaceship is faster than asteroids
-
-            #store path if cost is lowest
-            cost = frames
-            if least_cost == None or cost < least_cost:
-                least_cost = cost
-                best_dst = dst
-                best_angle = angle
-                best_turns = turns
-
-        return best_dst, best_angle, best_turns
+        if self.plan is None or frames != 1: #outside action, nothing planned
+            best = None
+            for asteroid in asteroid_ls:
+                estimate = self.asteroid_cost(spaceship, asteroid, frames)
+                if best is None or estimate[0] < best[0]:
+                    best = estimate
+            return best[1:]
+
+        #lowest possible current cost of each asteroid from its plan entry.
+        #Asteroids are recalculated in order of bound until none left could
+        #beat the best, so while plan_drift holds the choice is the one
+        #recalculating every cost would make: the first asteroid with the
+        #least cost
+        drift = self.plan_drift
+        if drift is None:
+            drift = plan_drift_bound()
+        misses = self.plan_misses
+        bounds = []
+        for i, asteroid in enumerate(asteroid_ls):
+            entry = self.planned_cost(spaceship, asteroid, 
+                                    self.replan_interval - 1)
+            bounds.append((entry[1] - drift * (self.frame - entry[0]),
+                        i, asteroid))
+        bounds.sort(key=lambda x:x[:2])
+
+        best = None
+        for bound, i, asteroid in bounds:
+            if best is not None and (bound, i) > best[:2]:
+                break
+            entry = self.planned_cost(spaceship, asteroid)
+            if best is None or (entry[1], i) < best[:2]:
+                best = (entry[1], i) + entry[2:]
+        self.plan_hits += len(asteroid_ls) - (self.plan_misses - misses)
+        return best[2:]
 
     def move(self, asteroid_ls, spaceship):
         #handles no asteroids left to target
@@ -308,7 +488,8 @@ class Player:
             turn = -1
         
         #stop moving forward if too close or moving forward is not optimal
-        if (dst > 3*self.turning_radius or turn == 0) and stat_turns <= 1:
+        if ((dst > self.thrust_cutoff*self.turning_radius or turn == 0) and 
+                stat_turns <= 1):
             thrust = True
         else:
             thrust = False
@@ -0,0 +1,91 @@
+"""
+Per-phase frame profiler for Engine.run_game.
+
+    profiler = FrameProfiler()
+    game = Engine('examples/game_state_good.txt', Player, profiler=profiler)
+    game.run_game()
+    profiler.write_report('profile.json')
+
+When no profiler is passed to Engine nothing is timed. Attaching a profiler
+replaces the engine's phase methods, player.action and GUI.draw_frame (or
+update_frame for renderers without it) on that engine instance only with
+wrappers timing them with perf_counter_ns.
+"""
+
+import json
+import time
+from collections import deque
+
+#Engine methods timed as phases, in game loop order
+engine_phases = ('update', 'move_spaceship', 'shoot_bullet', 'move_objects',
+                'use_fuel', 'detect_collisions', 'replenish_asteroids')
+
+
+class RollingHistogram:
+    '''Keeps the most recent window samples (ns) plus running totals'''
+
+    def __init__(self, window=10000):
+        self.samples = deque(maxlen=window)
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    def add(self, sample):
+        self.samples.append(sample)
+        self.count += 1
+        self.total += sample
+        if sample > self.max:
+            self.max = sample
+
+    def summary(self):
+        ordered = sorted(self.samples)
+        def rank(p): #nearest-rank percentile of samples in the window
+            return ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))]
+        if not ordered:
+            return {'count': 0}
+        return {'count': self.count,
+                'mean_ns': self.total / self.count,
+                'p50_ns': rank(50),
+                'p95_ns': rank(95),
+                'p99_ns': rank(99),
+                'max_ns': self.max}
+
+
+class FrameProfiler:
+    def __init__(self, window=10000):
+        self.window = window
+        self.histograms = {}
+
+    def histogram(self, phase):
+        if phase not in self.histograms:
+            self.histograms[phase] = RollingHistogram(self.window)
+        return self.histograms[phase]
+
+    def timed(self, phase, function):
+        '''returns function wrapped to record its run time under phase'''
+        histogram = self.histogram(phase)
+        perf_counter_ns = time.perf_counter_ns
+        def wrapper(*args, **kwargs):
+            start = perf_counter_ns()
+            result = function(*args, **kwargs)
+            histogram.add(perf_counter_ns() - start)
+            return result
+        return wrapper
+
+    def attach(self, engine):
+        '''instruments engine, called by Engine when given a profiler'''
+        for phase in engine_phases:
+            setattr(engine, phase, self.timed(phase, getattr(engine, phase)))
+        engine.player.action = self.timed('player_action', engine.player.action)
+        #draw_frame is also what a render thread calls
+        render = 'draw_frame' if hasattr(engine.GUI, 'draw_frame') else 'update_frame'
+        setattr(engine.GUI, render, self.timed('render', getattr(engine.GUI, render)))
+
+    def report(self):
+        '''returns dict of phase -> count, mean, p50, p95, p99 and max in ns'''
+        return {phase: histogram.summary()
+                for phase, histogram in self.histograms.items()}
+
+    def write_report(self, filename):
+        with open(filename, 'w') as f:
+            json.dump(self.report(), f, indent=2)
@@ -0,0 +1,201 @@
+"""
+Input recording and deterministic replay.
+
+Recording: pass a Recorder to Engine and every frame's player input is
+logged, with a full state checkpoint every checkpoint_interval frames.
+
+    game = Engine('examples/game_state_good.txt', Player, GUI,
+                recorder=Recorder('recordings/run1'))
+
+Replay: re-simulate headless from the nearest checkpoint.
+
+    replay = Replay('recordings/run1')
+    game = replay.seek(1234)   # Engine with 1234 frames played
+    replay.run(game)           # play on to the end of the recording
+
+Files in a recording directory:
+    inputs.bin              one byte per frame, bits thrust|left|right|bullet
+    upcoming.bin            upcoming asteroid records (see binary_state.py)
+                            at the start of the recording
+    checkpoint_<frame>.bin  binary state file (see binary_state.py) without
+                            upcoming asteroid records
+    checkpoint_<frame>.json engine state a state file does not hold, and
+                            the number of records of upcoming.bin used
+
+Upcoming asteroids listed in the state file are written once, to
+upcoming.bin, so a checkpoint does not copy the remaining ones. Games whose
+upcoming asteroids come from a spawner have no upcoming.bin; the spawner's
+state is saved in each checkpoint.
+"""
+
+import os
+import io
+import json
+import contextlib
+from game_engine import Engine
+from asteroid_spawner import AsteroidSpawner
+from binary_state import export_binary_state, pack_record, load_records
+
+input_bits = (8, 4, 2, 1) #thrust, left, right, bullet
+
+
+def pack_input(player_input):
+    return sum(bit for bit, pressed in zip(input_bits, player_input) if pressed)
+
+
+def unpack_input(packed):
+    return tuple(bool(packed & bit) for bit in input_bits)
+
+
+class Recorder:
+    def __init__(self, directory, checkpoint_interval=500):
+        self.directory = directory
+        self.checkpoint_interval = checkpoint_interval
+        os.makedirs(directory, exist_ok=True)
+        self.input_file = open(os.path.join(directory, 'inputs.bin'), 'wb')
+        #upcoming asteroids written to upcoming.bin, None until the first
+        #checkpoint or with a spawner
+        self.upcoming_count = None
+
+    def wrap(self, engine, player):
+        '''returns player whose actions are recorded, called by Engine'''
+        return RecordingPlayer(self, engine, player)
+
+    def record(self, frame, player_input):
+        self.input_file.write(bytes([pack_input(player_input)]))
+
+    def checkpoint(self, engine):
+        '''saves full engine state before frame engine.frame_count'''
+        upcoming = engine.upcoming_asteroid_ls
+        if self.upcoming_count is None and not isinstance(upcoming, AsteroidSpawner):
+            with open(os.path.join(self.directory, 'upcoming.bin'), 'wb') as f:
+                for asteroid in upcoming: #may be lazily loaded
+                    f.write(pack_record(asteroid))
+            self.upcoming_count = len(upcoming)
+        filename = os.path.join(self.directory, f'checkpoint_{engine.frame_count}')
+        export_binary_state(engine, filename + '.bin', upcoming=False)
+        #state not held in a state file
+        meta = {'frame_count': engine.frame_count,
+                'asteroids_count': engine.game_state['asteroids_count'],
+                'max_fuel': engine.max_fuel,
+                'fuel_warning_count': engine.fuel_warning_count,
+                'bullet_id_counter': engine.bullet_id_counter,
+                'hit_count': engine.hit_count,
+                'collision_count': engine.collision_count,
+                'bullet_move_counts': [bullet.move_count for bullet in engine.bullet_ls],
+                'upcoming_used': None}
+        if self.upcoming_count is not None:
+            meta['upcoming_used'] = self.upcoming_count - len(upcoming)
+        with open(filename + '.json', 'w') as f:
+            json.dump(meta, f)
+
+    def close(self):
+        self.input_file.close()
+
+
+class RecordingPlayer:
+    '''Wraps a player, recording its inputs and checkpointing the engine'''
+
+    def __init__(self, recorder, engine, player):
+        self.recorder = recorder
+        self.engine = engine
+        self.player = player
+
+    def action(self, spaceship, asteroid_ls, bullet_ls, fuel, score):
+        frame = self.engine.frame_count
+        if frame % self.recorder.checkpoint_interval == 0:
+            self.recorder.checkpoint(self.engine)
+
+        player_input = self.player.action(spaceship, asteroid_ls, bullet_ls, 
+                                        fuel, score)
+        self.recorder.record(frame, player_input)
+        return player_input
+
+
+class ReplayPlayer:
+    '''Player returning recorded inputs, starting at frame'''
+
+    def __init__(self, inputs, frame):
+        self.inputs = inputs
+        self.frame = frame
+
+    def action(self, spaceship, asteroid_ls, bullet_ls, fuel, score):
+        if self.frame >= len(self.inputs):
+            raise ValueError(f'Error: recording has no input for frame {self.frame}')
+        player_input = unpack_input(self.inputs[self.frame])
+        self.frame += 1
+        return player_input
+
+
+class Replay:
+    def __init__(self, directory, engine_class=Engine):
+        self.directory = directory
+        self.engine_class = engine_class
+        with open(os.path.join(directory, 'inputs.bin'), 'rb') as f:
+            self.inputs = f.read()
+        self.checkpoint_frames = sorted(
+            int(filename[len('checkpoint_'):-len('.json')])
+            for filename in os.listdir(directory)
+            if filename.startswith('checkpoint_') and filename.endswith('.json'))
+        if not self.checkpoint_frames:
+            raise ValueError(f'Error: no checkpoints in {directory}')
+
+    def __len__(self):
+        '''number of recorded frames'''
+        return len(self.inputs)
+
+    def load_checkpoint(self, frame):
+        '''returns headless engine restored from the checkpoint at frame'''
+        filename = os.path.join(self.directory, f'checkpoint_{frame}')
+        engine = self.engine_class(filename + '.bin',
+                                lambda: ReplayPlayer(self.inputs, frame),
+                                headless=True)
+        with open(filename + '.json') as f:
+            meta = json.load(f)
+        engine.frame_count = meta['frame_count']
+        engine.game_state['asteroids_count'] = meta['asteroids_count']
+        engine.max_fuel = meta['max_fuel']
+        engine.fuel_warning_count = meta['fuel_warning_count']
+        engine.bullet_id_counter = meta['bullet_id_counter']
+        engine.hit_count = meta['hit_count']
+        engine.collision_count = meta['collision_count']
+        for bullet, move_count in zip(engine.bullet_ls, meta['bullet_move_counts']):
+            bullet.move_count = move_count
+        #upcoming_used is None with a spawner, and missing from older
+        #recordings whose checkpoints hold the upcoming asteroids
+        if meta.get('upcoming_used') is not None:
+            engine.upcoming_asteroid_ls = load_records(
+                os.path.join(self.directory, 'upcoming.bin'), meta['upcoming_used'],
+                engine.game_state['width'], engine.game_state['height'])
+            engine.game_state['upcoming_asteroids_count'] = len(engine.upcoming_asteroid_ls)
+        return engine
+
+    def seek(self, frame, quiet=True):
+        '''returns headless engine with frame frames played, simulated from
+        the nearest checkpoint at or before frame'''
+        if not 0 <= frame <= len(self):
+            raise ValueError(f'Error: frame {frame} not in recording of {len(self)} frames')
+        start = max(checkpoint for checkpoint in self.checkpoint_frames
+                    if checkpoint <= frame)
+        engine = self.load_checkpoint(start)
+        self.advance(engine, frame - start, quiet)
+        return engine
+
+    def advance(self, engine, frames, quiet=True):
+        '''plays frames recorded frames on engine; returns True if game ended'''
+        output = io.StringIO() if quiet else None
+        with contextlib.redirect_stdout(output) if quiet else contextlib.nullcontext():
+            for _ in range(frames):
+                player_input = engine.player.action(engine.game_state['spaceship'],
+                                                    engine.asteroid_ls,
+                                                    engine.bullet_ls,
+                                                    engine.game_state['fuel'],
+                                                    engine.game_state['score'])
+                if engine.update(player_input):
+                    return True
+        return False
+
+    def run(self, engine, quiet=True):
+        '''plays engine on to the end of the recording'''
+        self.advance(engine, len(self) - engine.frame_count, quiet)
+        return engine
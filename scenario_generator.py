@@ -0,0 +1,74 @@
+"""
+Seeded generator of valid game state files.
+
+    python3 scenario_generator.py out.txt --seed 1 --asteroids 1000 --upcoming 100000
+
+With --spawner the upcoming asteroids are declared by a spawner line (see
+asteroid_spawner.py) instead of being listed.
+"""
+
+import random
+import argparse
+import config
+
+
+def generate_state(filename, seed=0, asteroids=10, upcoming=100, bullets=0,
+                width=900, height=600, fuel=1000, score=0, spawner=False):
+    '''writes a random game state file; the same arguments always give the
+    same file'''
+    rng = random.Random(seed)
+
+    def space_obj_line(key, angle_step=1, id=0):
+        x = rng.uniform(0, width)
+        y = rng.uniform(0, height)
+        angle = rng.randrange(0, 360, angle_step)
+        return f'{key} {x:.1f},{y:.1f},{angle},{id}'
+
+    lines = [f'width {width}',
+            f'height {height}',
+            f'score {score}',
+            f'spaceship {width / 2:.1f},{height / 2:.1f},90,0',
+            f'fuel {fuel}',
+            f'asteroids_count {asteroids}']
+    #asteroid ids are unique across current and upcoming asteroids
+    for id in range(asteroids):
+        key = rng.choice(('asteroid_small', 'asteroid_large'))
+        lines.append(space_obj_line(key, id=id))
+
+    #bullets fly at spaceship headings
+    lines.append(f'bullets_count {bullets}')
+    for id in range(bullets):
+        lines.append(space_obj_line('bullet', config.angle_increment, id))
+
+    lines.append(f'upcoming_asteroids_count {upcoming}')
+    if spawner:
+        lines.append(f'upcoming_spawner seed={seed},next_id={asteroids}')
+    else:
+        for id in range(asteroids, asteroids + upcoming):
+            key = rng.choice(('upcoming_asteroid_small', 'upcoming_asteroid_large'))
+            lines.append(space_obj_line(key, id=id))
+
+    with open(filename, 'w') as f:
+        f.write('\n'.join(lines) + '\n')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Generate a random game state file')
+    parser.add_argument('filename')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--asteroids', type=int, default=10)
+    parser.add_argument('--upcoming', type=int, default=100)
+    parser.add_argument('--bullets', type=int, default=0)
+    parser.add_argument('--width', type=int, default=900)
+    parser.add_argument('--height', type=int, default=600)
+    parser.add_argument('--fuel', type=int, default=1000)
+    parser.add_argument('--spawner', action='store_true',
+                        help='generate upcoming asteroids with a spawner line')
+    args = parser.parse_args(argv)
+    generate_state(args.filename, args.seed, args.asteroids, args.upcoming,
+                args.bullets, args.width, args.height, args.fuel,
+                spawner=args.spawner)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,5 +1,6 @@
 import math
 import config
+from trig_table import velocity
 
 class SpaceObject:
     def __init__(self, x, y, width, height, angle, obj_type, id):
@@ -25,13 +26,12 @@ class SpaceObject:
     def move_forward(self):
         if self.obj_type == 'bullet': #add 1 to age of bullet
             self.move_count += 1
-        speed  = config.speed[self.obj_type]
-        
         #movement is a vector with direction as object.angle and magnitude = 
         #object speed, so cos() gives change in x and sin() change in y
-        #angles in deg must be converted to rad
-        self.x = (self.x + speed*math.cos(math.radians(self.angle))) % self.width
-        self.y = (self.y - speed*math.sin(math.radians(self.angle))) % self.height
+        #looked up from precomputed table rather than recalculated
+        dx, dy = velocity(self.obj_type, self.angle)
+        self.x = (self.x + dx) % self.width
+        self.y = (self.y - dy) % self.height
         # % operator enables wraparound, and restricts x,y in width,height
 
     def get_xy(self):
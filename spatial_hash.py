@@ -0,0 +1,97 @@
+import math
+import config
+
+#largest possible collision distance between any two space objects
+max_collide_dist = 2 * max(config.radius.values())
+
+class SpatialHash:
+    '''Uniform grid over the wraparound screen. Each cell is at least
+    max_collide_dist wide, so any two colliding objects are always in the same
+    or neighbouring cells (including neighbours across the screen edges)'''
+
+    def __init__(self, width, height, cell_size=max_collide_dist):
+        self.width = width
+        self.height = height
+        #whole number of cells so the grid wraps cleanly
+        self.cols = max(1, int(width // cell_size))
+        self.rows = max(1, int(height // cell_size))
+        self.cell_w = width / self.cols
+        self.cell_h = height / self.rows
+        self.cells = {}
+        self.positions = {} #key -> (x, y), for nearest and within queries
+
+    def cell_of(self, x, y):
+        '''returns (col, row) of the cell containing x,y'''
+        # % keeps positions outside the screen on the torus, the extra % guards
+        #against float rounding placing x right on the far edge
+        col = int((x % self.width) // self.cell_w) % self.cols
+        row = int((y % self.height) // self.cell_h) % self.rows
+        return (col, row)
+
+    def insert(self, key, x, y):
+        self.cells.setdefault(self.cell_of(x, y), []).append(key)
+        self.positions[key] = (x, y)
+
+    def query(self, x, y):
+        '''returns sorted keys in the cell containing x,y and its 8 neighbours'''
+        col, row = self.cell_of(x, y)
+        #set of cells handles grids less than 3 cells wide, where neighbours
+        #wrap onto the same cell
+        neighbours = {((col + dc) % self.cols, (row + dr) % self.rows)
+                    for dc in (-1, 0, 1) for dr in (-1, 0, 1)}
+        keys = []
+        for cell in neighbours:
+            keys.extend(self.cells.get(cell, ()))
+        keys.sort()
+        return keys
+
+    def distance(self, x1, y1, x2, y2):
+        '''shortest distance between two points on the wraparound screen'''
+        x_diff = min(x2-x1, x2-x1 + self.width, x2-x1 - self.width, key=abs)
+        y_diff = min(y2-y1, y2-y1 + self.height, y2-y1 - self.height, key=abs)
+        return math.dist([0, 0], [x_diff, y_diff])
+
+    def ring(self, col, row, r):
+        '''returns set of cells r cells away (in either axis) from col,row'''
+        cells = set()
+        for dc in range(-r, r + 1):
+            for dr in range(-r, r + 1):
+                if max(abs(dc), abs(dr)) == r:
+                    cells.add(((col + dc) % self.cols, (row + dr) % self.rows))
+        return cells
+
+    def nearest(self, x, y, k):
+        '''returns up to k keys nearest to x,y, nearest first (ties by key).
+        Searches rings of cells outwards from x,y, stopping once no unsearched
+        cell can hold anything nearer than the k-th key found'''
+        col, row = self.cell_of(x, y)
+        searched = set()
+        found = [] #(distance, key)
+        #x,y may be anywhere in its cell, so cells r + 1 rings out are at
+        #least r cells away
+        min_cell = min(self.cell_w, self.cell_h)
+        max_ring = max(self.cols, self.rows) // 2 + 1
+        for r in range(max_ring + 1):
+            for cell in self.ring(col, row, r) - searched:
+                searched.add(cell)
+                for key in self.cells.get(cell, ()):
+                    found.append((self.distance(x, y, *self.positions[key]), key))
+            if len(found) >= k:
+                found.sort()
+                if found[k - 1][0] <= r * min_cell:
+                    break
+        found.sort()
+        return [key for _, key in found[:k]]
+
+    def within(self, x, y, radius):
+        '''returns sorted keys within radius of x,y'''
+        col, row = self.cell_of(x, y)
+        rings = min(int(radius // min(self.cell_w, self.cell_h)) + 1,
+                    max(self.cols, self.rows) // 2 + 1)
+        cells = set()
+        for r in range(rings + 1):
+            cells |= self.ring(col, row, r)
+        keys = [key for cell in cells for key in self.cells.get(cell, ())
+                if self.distance(x, y, *self.positions[key]) <= radius]
+        keys.sort()
+        return keys
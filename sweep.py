@@ -0,0 +1,354 @@
+"""
+Parameter sweeps over Player attributes and config values across a corpus of
+game state files, run headless in parallel with results cached on disk.
+
+    python3 sweep.py examples/*.txt --param thrust_cutoff=2,3,4 \\
+        --param config.speed.spaceship=8,10,12 --report sweep.csv
+    python3 sweep.py examples/*.txt --param shoot_range=3:10 \\
+        --param turning_radius=10.0:40.0 --random 50 --seed 1
+
+A parameter is either a Player attribute, set after the player is created
+(turning_radius, shoot_range, thrust_cutoff, option_move_weight,
+option_turn_weight, target_count, ...), or a config value written as
+config.name, or config.name.key for dict values such as config.speed.bullet.
+config.radius cannot be swept, as collision grids and tables are sized from
+it when the game's modules are imported.
+Its values are a comma separated list, or with --random a range lo:hi
+sampled uniformly (as integers if both ends are). Without --random every
+combination of values is run; with --random N, N combinations are sampled.
+
+Each game's result is cached in cache_dir (sweep under config.cache_dir)
+keyed by the parameters, player, state file contents and code version (a
+hash of the source files), so running a sweep again only plays games it has
+not played before. Timed out games and games which raised an error are not
+cached. Configurations are ranked by mean score, or with --rank tail by
+the tail_percentile score (default the 10th percentile).
+"""
+
+import os
+import sys
+import csv
+import glob
+import json
+import random
+import hashlib
+import argparse
+import itertools
+import functools
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import config
+import frame_table
+import trig_table
+from batch_runner import run_one, load_class
+
+cache_dir = os.path.join(frame_table.cache_dir, 'sweep')
+#config values tabulated at import which set_config cannot update
+fixed_config = ('radius',)
+rank_fields = ('rank', 'runs', 'ok', 'mean_score', 'tail_score', 'min_score',
+            'max_score')
+
+
+def parse_value(text):
+    '''returns text as a number, bool or None if it is one, else the string'''
+    try:
+        return json.loads(text)
+    except ValueError:
+        return text
+
+
+def parse_param(spec):
+    '''returns (name, values) from "name=a,b,c", or (name, (lo, hi)) as a
+    range from "name=lo:hi"'''
+    name, sep, values = spec.partition('=')
+    if not sep or not name or not values:
+        raise ValueError(f'Error: parameter {spec} is not name=values')
+    if ':' in values:
+        lo, hi = (parse_value(value) for value in values.split(':', 1))
+        if not all(isinstance(value, (int, float)) for value in (lo, hi)):
+            raise ValueError(f'Error: range of {name} is not numbers')
+        return name, (lo, hi)
+    return name, [parse_value(value) for value in values.split(',')]
+
+
+def grid(params):
+    '''returns every combination of params {name: values} as dicts'''
+    for name, values in params.items():
+        if isinstance(values, tuple):
+            raise ValueError(f'Error: range for {name} needs --random')
+    names = list(params)
+    return [dict(zip(names, values))
+            for values in itertools.product(*params.values())]
+
+
+def random_search(params, count, seed=None):
+    '''returns count random combinations of params as dicts, sampling value
+    lists uniformly and ranges (lo, hi) uniformly between lo and hi'''
+    rng = random.Random(seed)
+    configs = []
+    for _ in range(count):
+        combination = {}
+        for name, values in params.items():
+            if isinstance(values, list):
+                combination[name] = rng.choice(values)
+            elif all(isinstance(value, int) for value in values):
+                combination[name] = rng.randint(*values)
+            else:
+                combination[name] = rng.uniform(*values)
+        configs.append(combination)
+    return configs
+
+
+def file_hash(filename):
+    with open(filename, 'rb') as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+def code_version(player_spec):
+    '''returns hash of the game's source files and the player's module'''
+    filenames = set(glob.glob(os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                        '*.py')))
+    module = sys.modules.get(load_class(player_spec).__module__)
+    if getattr(module, '__file__', None) is not None:
+        filenames.add(os.path.abspath(module.__file__))
+    digest = hashlib.sha1()
+    for filename in sorted(filenames):
+        digest.update(os.path.basename(filename).encode())
+        digest.update(bytes.fromhex(file_hash(filename)))
+    return digest.hexdigest()
+
+
+def cell_key(params, player_spec, state_hash, version):
+    values = json.dumps([params, player_spec, state_hash, version], sort_keys=True)
+    return hashlib.sha1(values.encode()).hexdigest()
+
+
+def load_cached(directory, key):
+    '''returns cached result for key, or None'''
+    try:
+        with open(os.path.join(directory, key + '.json')) as f:
+            return json.load(f)
+    except (OSError, ValueError): #missing, or written by an interrupted run
+        return None
+
+
+def save_cached(directory, key, result):
+    #written to a temporary file and renamed, as in frame_table.py
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_filename = tempfile.mkstemp(dir=directory)
+    with os.fdopen(fd, 'w') as f:
+        json.dump(result, f)
+    os.replace(temp_filename, os.path.join(directory, key + '.json'))
+
+
+def set_config(values):
+    '''sets config values {'name' or 'name.key': value}; returns the
+    previous values, to restore them with set_config'''
+    previous = {}
+    for name, value in values.items():
+        name, _, key = name.partition('.')
+        if key:
+            table = getattr(config, name)
+            previous[f'{name}.{key}'] = table[key]
+            table[key] = value
+        else:
+            previous[name] = getattr(config, name)
+            setattr(config, name, value)
+    #velocities and batch_engine's fuel warnings are tabulated from config
+    #at import
+    trig_table.velocity_table.update(trig_table.build_velocity_table())
+    if 'world_arrays' in sys.modules:
+        sys.modules['world_arrays'].update_velocity_arrays()
+    if 'batch_engine' in sys.modules:
+        batch_engine = sys.modules['batch_engine']
+        batch_engine.fuel_warning_threshold = batch_engine.np.array(
+            config.fuel_warning_threshold)
+    return previous
+
+
+def make_player(player_class, attributes):
+    player = player_class()
+    for name, value in attributes.items():
+        setattr(player, name, value)
+    #the frame table is built for the turning radius
+    if 'turning_radius' in attributes and getattr(player, 'frame_table', None):
+        player.frame_table = frame_table.FrameTable.load(player.relative_frame_estimate,
+                                                        player.turning_radius)
+    return player
+
+
+def check_params(configs, player_spec='player:Player'):
+    '''raises ValueError naming the first parameter which is not a config
+    value or player attribute, or is a config value which cannot be set'''
+    player = load_class(player_spec)()
+    for name in {name for params in configs for name in params}:
+        if name.startswith('config.'):
+            name, _, key = name[len('config.'):].partition('.')
+            if not hasattr(config, name) or (key and key not in getattr(config, name)):
+                raise ValueError(f'Error: unknown config value {name} {key}'.rstrip())
+            if name in fixed_config:
+                raise ValueError(f'Error: config.{name} cannot be swept')
+        elif not hasattr(player, name):
+            raise ValueError(f'Error: player has no attribute {name}')
+
+
+def run_cell(params, state_file, player_spec='player:Player', timeout=None):
+    '''runs one game with params applied; returns batch_runner.run_one result'''
+    config_values = {name[len('config.'):]: value for name, value in params.items()
+                    if name.startswith('config.')}
+    attributes = {name: value for name, value in params.items()
+                if not name.startswith('config.')}
+    #config is changed for this game only, workers run many games
+    previous = set_config(config_values)
+    try:
+        player = functools.partial(make_player, load_class(player_spec), attributes)
+        return run_one(state_file, player, timeout)
+    finally:
+        set_config(previous)
+
+
+def run_sweep(configs, state_files, player_spec='player:Player', workers=None,
+            timeout=None, directory=cache_dir, progress=True):
+    '''plays every state file with every configuration, reusing cached
+    results; returns list of results per state file for each configuration.
+    Parameters should be checked with check_params first'''
+    version = code_version(player_spec)
+    state_hashes = [file_hash(state_file) for state_file in state_files]
+    results = [[None] * len(state_files) for _ in configs]
+    todo = {}
+    for i, params in enumerate(configs):
+        for j, state_hash in enumerate(state_hashes):
+            key = cell_key(params, player_spec, state_hash, version)
+            result = load_cached(directory, key) if directory else None
+            if result is None:
+                todo[(i, j)] = key
+            else:
+                result['state_file'] = state_files[j]
+                results[i][j] = result
+    if progress:
+        print(f'{len(configs) * len(state_files) - len(todo)} games cached, '
+            f'{len(todo)} to play', file=sys.stderr)
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(run_cell, configs[i], state_files[j], player_spec,
+                            timeout): (i, j)
+                for i, j in todo}
+        for done, future in enumerate(as_completed(futures), 1):
+            i, j = futures[future]
+            result = future.result()
+            results[i][j] = result
+            if directory and result['status'] == 'ok':
+                save_cached(directory, todo[(i, j)], result)
+            if progress:
+                print(f'[{done}/{len(todo)}] {result["status"]:7} '
+                    f'{state_files[j]} {configs[i]}', file=sys.stderr)
+    return results
+
+
+def percentile(values, p):
+    '''nearest-rank percentile, as in profiler.py'''
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))]
+
+
+def rank(configs, results, by='mean', tail_percentile=10):
+    '''returns a row per configuration with its score statistics, best
+    first by mean or tail score. Configurations with failed games rank
+    after those without'''
+    rows = []
+    for params, config_results in zip(configs, results):
+        scores = [result['score'] for result in config_results
+                if result['status'] == 'ok']
+        rows.append({'runs': len(config_results),
+                    'ok': len(scores),
+                    'mean_score': sum(scores) / len(scores) if scores else None,
+                    'tail_score': percentile(scores, tail_percentile) if scores else None,
+                    'min_score': min(scores, default=None),
+                    'max_score': max(scores, default=None),
+                    'params': params})
+    metric = by + '_score'
+    rows.sort(key=lambda row: (row['ok'] < row['runs'], row[metric] is None,
+                            -(row[metric] or 0), -(row['mean_score'] or 0)))
+    for i, row in enumerate(rows, 1):
+        row['rank'] = i
+    return rows
+
+
+def write_report(rows, report_filename):
+    '''writes ranking as JSON if filename ends in .json, otherwise as CSV
+    with a column per parameter'''
+    if os.path.splitext(report_filename)[1] == '.json':
+        with open(report_filename, 'w') as f:
+            json.dump(rows, f, indent=2)
+        return
+    names = list(dict.fromkeys(name for row in rows for name in row['params']))
+    with open(report_filename, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(rank_fields + tuple(names))
+        for row in rows:
+            writer.writerow([row[field] for field in rank_fields] +
+                            [row['params'].get(name) for name in names])
+
+
+def print_ranking(rows, top=10):
+    for row in rows[:top]:
+        if row['mean_score'] is None:
+            scores = 'no games completed'
+        else:
+            scores = (f'mean {row["mean_score"]:9.1f}  tail {row["tail_score"]:7}  '
+                    f'min {row["min_score"]:7}')
+        failed = row['runs'] - row['ok']
+        print(f'{row["rank"]:3}. {scores}' + (f'  {failed} failed' if failed else '') +
+            '  ' + ' '.join(f'{name}={value!r}' for name, value in row['params'].items()))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Sweep Player and config '
+                                                'parameters over game state files')
+    parser.add_argument('state_files', nargs='+')
+    parser.add_argument('--param', action='append', required=True,
+                        metavar='NAME=VALUES',
+                        help='values a,b,c, or a range lo:hi with --random')
+    parser.add_argument('--random', type=int, metavar='N',
+                        help='sample N configurations instead of the full grid')
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--player', default='player:Player',
+                        help='player class as module:Class')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--timeout', type=float, default=None,
+                        help='seconds allowed per game')
+    parser.add_argument('--rank', choices=('mean', 'tail'), default='mean')
+    parser.add_argument('--tail-percentile', type=float, default=10)
+    parser.add_argument('--report', default='sweep_report.csv',
+                        help='.csv or .json ranking file')
+    parser.add_argument('--cache-dir', default=cache_dir)
+    parser.add_argument('--no-cache', action='store_true')
+    parser.add_argument('--top', type=int, default=10,
+                        help='configurations to print')
+    parser.add_argument('--quiet', action='store_true',
+                        help='no per-game progress')
+    args = parser.parse_args(argv)
+
+    try:
+        params = dict(parse_param(spec) for spec in args.param)
+        if args.random is None:
+            configs = grid(params)
+        else:
+            configs = random_search(params, args.random, args.seed)
+    except ValueError as e:
+        parser.error(str(e))
+
+    try:
+        check_params(configs, args.player)
+    except ValueError as e:
+        parser.error(str(e))
+    results = run_sweep(configs, args.state_files, args.player, args.workers,
+                        args.timeout, None if args.no_cache else args.cache_dir,
+                        not args.quiet)
+    rows = rank(configs, results, args.rank, args.tail_percentile)
+    write_report(rows, args.report)
+    print_ranking(rows, args.top)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,34 @@
+import math
+import config
+
+#headings are integer degrees, so cos/sin of every heading is computed once
+#per process. Values use the same expressions as the original per-call code,
+#so results are bit for bit identical
+unit_table = {angle: (math.cos(math.radians(angle)), math.sin(math.radians(angle)))
+            for angle in range(360)}
+
+def build_velocity_table():
+    '''returns {obj_type: {angle: (dx, dy)}} for the speeds in config.speed'''
+    return {obj_type: {angle: (speed * cos_a, speed * sin_a)
+                    for angle, (cos_a, sin_a) in unit_table.items()}
+            for obj_type, speed in config.speed.items()}
+
+#(dx, dy) moved per frame by each obj_type at each heading; if config.speed
+#is changed, update it in place with build_velocity_table()
+velocity_table = build_velocity_table()
+
+def unit_vector(angle):
+    '''returns (cos, sin) of angle in degrees'''
+    vector = unit_table.get(angle)
+    if vector is None: #angle outside 0 <= angle < 360 or not an integer
+        vector = (math.cos(math.radians(angle)), math.sin(math.radians(angle)))
+    return vector
+
+def velocity(obj_type, angle):
+    '''returns (dx, dy) an object of obj_type moves per frame at angle'''
+    vector = velocity_table[obj_type].get(angle)
+    if vector is None:
+        speed = config.speed[obj_type]
+        vector = (speed * math.cos(math.radians(angle)), 
+                speed * math.sin(math.radians(angle)))
+    return vector
@@ -0,0 +1,101 @@
+import os
+from collections import deque
+
+upcoming_keys = ['upcoming_asteroid_small', 'upcoming_asteroid_large']
+
+class StreamingQueue:
+    '''Upcoming asteroids streamed from a text state file as they are needed.
+    Holds at most read_ahead parsed asteroids in memory and supports the list
+    operations Engine uses: len, iteration and pop(0). Lines are validated with
+    the same line numbered errors as Engine.import_state when they are read.
+    The file is only open while asteroids are read from it, so many queues
+    can be streamed at once'''
+
+    def __init__(self, engine, game_state_filename, position, count, line_num,
+                read_ahead=256):
+        self.engine = engine #for get_key_value and import_space_obj
+        self.read_ahead = read_ahead
+        self.count = max(0, count)
+        self.popped = 0
+        self.buffer = deque()
+        self.reopen(game_state_filename, position, line_num)
+
+    def reopen(self, game_state_filename, position, line_num):
+        '''reads the remaining asteroids from position in game_state_filename
+        on, line_num being the line before them'''
+        self.game_state_filename = game_state_filename
+        self.position = position #of the next line to read
+        self.line_num = line_num #last line number read
+        self.lines_read = self.popped
+        self.buffer.clear()
+        self.file_id = None #identifies the file the first time it is opened
+        self.done = False #all read, and EOF checked
+        self.fill()
+
+    def open(self):
+        '''returns the state file opened at the next line to read, raising
+        ValueError if the file was changed since it was first opened'''
+        f = open(self.game_state_filename, 'r')
+        stat = os.fstat(f.fileno())
+        file_id = (stat.st_dev, stat.st_ino, stat.st_size, stat.st_mtime_ns)
+        if self.file_id is None:
+            self.file_id = file_id
+        elif file_id != self.file_id:
+            f.close()
+            raise ValueError(f'Error: {self.game_state_filename} changed while '
+                            'its upcoming asteroids were being read')
+        f.seek(self.position)
+        return f
+
+    def reads(self, filename):
+        '''returns True if the queue reads its asteroids from filename'''
+        try:
+            stat = os.stat(filename)
+        except OSError:
+            return False
+        return self.file_id is not None and (stat.st_dev, stat.st_ino) == self.file_id[:2]
+
+    def read_asteroid(self, file, line_num):
+        key_value = self.engine.get_key_value(upcoming_keys, file, line_num)
+        return self.engine.import_space_obj(key_value, line_num)
+
+    def fill(self):
+        '''reads up to read_ahead asteroids into the buffer'''
+        if self.done:
+            return
+        with self.open() as f:
+            while len(self.buffer) < self.read_ahead and self.lines_read < self.count:
+                self.line_num += 1
+                self.buffer.append(self.read_asteroid(f, self.line_num))
+                self.lines_read += 1
+            self.position = f.tell()
+
+            if self.lines_read == self.count: #Check EOF
+                key_value = f.readline().strip().split(' ')
+                self.done = True
+                if key_value != ['']:
+                    raise ValueError(f'Error: unexpected key: {key_value[0]} in line {self.line_num + 1}')
+
+    def __len__(self):
+        return self.count - self.popped
+
+    def __iter__(self):
+        '''iterates remaining asteroids without removing them'''
+        yield from list(self.buffer)
+        if self.done:
+            return
+        with self.open() as f:
+            line_num = self.line_num
+            for _ in range(self.count - self.lines_read):
+                line_num += 1
+                yield self.read_asteroid(f, line_num)
+
+    def pop(self, index=0):
+        if index != 0:
+            raise IndexError('StreamingQueue only supports pop(0)')
+        if not self.buffer:
+            self.fill()
+        if not self.buffer:
+            raise IndexError('pop from empty StreamingQueue')
+        self.popped += 1
+        return self.buffer.popleft()
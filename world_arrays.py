@@ -0,0 +1,197 @@
+import sys
+import config
+from game_engine import Engine
+from space_object import SpaceObject
+from trig_table import velocity, velocity_table
+
+try:
+    import numpy as np
+except ImportError:
+    print("Error: 'numpy' module is not installed.")
+    sys.exit(1)
+
+#obj_type stored in arrays as index into this tuple
+obj_types = ('spaceship', 'bullet', 'asteroid_small', 'asteroid_large')
+type_codes = {obj_type: code for code, obj_type in enumerate(obj_types)}
+bullet_code = type_codes['bullet']
+
+
+def velocity_arrays():
+    '''returns (velocity_x, velocity_y) arrays indexed by type code and angle'''
+    return (np.array([[velocity_table[obj_type][angle][0]
+                    for angle in range(360)] for obj_type in obj_types]),
+            np.array([[velocity_table[obj_type][angle][1]
+                    for angle in range(360)] for obj_type in obj_types]))
+
+
+#velocity of every obj_type at every integer angle, from the same table as
+#SpaceObject.move_forward so positions match bit for bit; if velocity_table
+#is rebuilt, update them in place with update_velocity_arrays()
+velocity_x, velocity_y = velocity_arrays()
+
+
+def update_velocity_arrays():
+    velocity_x[:], velocity_y[:] = velocity_arrays()
+
+
+class ObjectArrays:
+    '''Struct-of-arrays store for a group of space objects. Slot i of every
+    array belongs to the same object, and views[i] is its SpaceObjectView'''
+
+    def __init__(self, width, height, capacity=16):
+        self.width = width
+        self.height = height
+        self.n = 0
+        self.x = np.empty(capacity)
+        self.y = np.empty(capacity)
+        self.angle = np.empty(capacity, dtype=np.int64)
+        self.type_code = np.empty(capacity, dtype=np.int8)
+        self.id = np.empty(capacity, dtype=np.int64)
+        self.move_count = np.empty(capacity, dtype=np.int64)
+        self.views = []
+
+    def arrays(self):
+        return ('x', 'y', 'angle', 'type_code', 'id', 'move_count')
+
+    def append(self, space_obj):
+        '''copies space_obj into the next free slot; returns its view'''
+        if self.n == len(self.x): #double capacity when full
+            for name in self.arrays():
+                old = getattr(self, name)
+                new = np.empty(2 * len(old), dtype=old.dtype)
+                new[:self.n] = old[:self.n]
+                setattr(self, name, new)
+
+        i = self.n
+        self.x[i] = space_obj.x
+        self.y[i] = space_obj.y
+        self.angle[i] = space_obj.angle
+        self.type_code[i] = type_codes[space_obj.obj_type]
+        self.id[i] = space_obj.id
+        self.move_count[i] = getattr(space_obj, 'move_count', 0)
+        self.n += 1
+
+        view = SpaceObjectView(self, i)
+        self.views.append(view)
+        return view
+
+    def move(self):
+        '''moves every object forward one frame, ageing bullets'''
+        n = self.n
+        if n == 0:
+            return
+        type_code = self.type_code[:n]
+        angle = self.angle[:n]
+        self.move_count[:n] += (type_code == bullet_code)
+        if angle.min() >= 0 and angle.max() < 360:
+            dx = velocity_x[type_code, angle]
+            dy = velocity_y[type_code, angle]
+        else: #headings from a state file are not always normalised
+            dx, dy = np.array([velocity(obj_types[t], int(a))
+                            for t, a in zip(type_code, angle)]).T
+        # % operator enables wraparound, same as SpaceObject.move_forward
+        self.x[:n] = (self.x[:n] + dx) % self.width
+        self.y[:n] = (self.y[:n] - dy) % self.height
+
+    def expired(self):
+        '''returns boolean mask of slots holding bullets which have expired'''
+        n = self.n
+        return ((self.type_code[:n] == bullet_code) &
+                (self.move_count[:n] >= config.bullet_move_count))
+
+    def remove_slots(self, slots):
+        '''removes objects in the given slots, compacting the arrays'''
+        if len(slots) == 0:
+            return
+        keep = np.ones(self.n, dtype=bool)
+        keep[list(slots)] = False
+        n = int(keep.sum())
+        for name in self.arrays():
+            array = getattr(self, name)
+            array[:n] = array[:self.n][keep]
+        self.n = n
+
+        for slot in slots: #mark removed views
+            self.views[slot].slot = None
+        self.views = [view for view in self.views if view.slot is not None]
+        for slot, view in enumerate(self.views):
+            view.slot = slot
+
+
+def array_property(name, cast):
+    '''property reading/writing one array of the view's ObjectArrays'''
+    def getter(self):
+        return cast(getattr(self.group, name)[self.slot])
+    def setter(self, value):
+        getattr(self.group, name)[self.slot] = value
+    return property(getter, setter)
+
+
+class SpaceObjectView(SpaceObject):
+    '''SpaceObject whose attributes live in a slot of ObjectArrays, so it can
+    be handed to Player.action and the GUI like any other SpaceObject'''
+
+    x = array_property('x', float)
+    y = array_property('y', float)
+    angle = array_property('angle', int)
+    id = array_property('id', int)
+    move_count = array_property('move_count', int)
+
+    def __init__(self, group, slot):
+        self.group = group
+        self.slot = slot
+
+    @property
+    def obj_type(self):
+        return obj_types[self.group.type_code[self.slot]]
+
+    @property
+    def width(self):
+        return self.group.width
+
+    @property
+    def height(self):
+        return self.group.height
+
+    @property
+    def radius(self):
+        return config.radius[self.obj_type]
+
+
+class ArrayEngine(Engine):
+    '''Engine which stores asteroids and bullets in NumPy arrays and moves them
+    in one vectorized step per frame. The asteroid and bullet registries hold
+    SpaceObjectViews into the arrays'''
+
+    def import_state(self, game_state_filename):
+        super().import_state(game_state_filename)
+        width, height = self.game_state['width'], self.game_state['height']
+        self.asteroid_arrays = ObjectArrays(width, height)
+        self.bullet_arrays = ObjectArrays(width, height)
+        self.asteroid_ls = [self.asteroid_arrays.append(asteroid)
+                            for asteroid in self.asteroid_ls]
+        self.bullet_ls = [self.bullet_arrays.append(bullet)
+                        for bullet in self.bullet_ls]
+
+    def move_objects(self):
+        self.asteroid_arrays.move()
+
+        expired = self.bullet_arrays.expired()
+        if expired.any():
+            self.remove_bullets([self.bullet_arrays.views[slot] 
+                                for slot in expired.nonzero()[0]])
+        self.bullet_arrays.move()
+
+    def add_asteroid(self, asteroid):
+        super().add_asteroid(self.asteroid_arrays.append(asteroid))
+
+    def add_bullet(self, bullet):
+        super().add_bullet(self.bullet_arrays.append(bullet))
+
+    def remove_asteroids(self, asteroids):
+        self.asteroid_arrays.remove_slots([asteroid.slot for asteroid in asteroids])
+        super().remove_asteroids(asteroids)
+
+    def remove_bullets(self, bullets):
+        self.bullet_arrays.remove_slots([bullet.slot for bullet in bullets])
+        super().remove_bullets(bullets)